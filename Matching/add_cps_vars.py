@@ -13,7 +13,7 @@ def add_cps(cps_recs, match, puffile):
     cpsfile = cps_recs.filter(regex='jcps\d{1,2}$|icps\d{1}$|jcps100|cpsseq')
     # match = pd.read_csv('match.csv')
     # puffile = pd.read_sas('puf2009.sas7bdat')
-    puffile = puffile[puffile['recid'] != 999999]
+    # The aggregate records are dropped by puf.load_puf
     puffile['filer'] = 1
     puffile['wt'] = puffile['s006']/100
     puffile['soiseq'] = puffile.index + 1
@@ -8,8 +8,8 @@ import pandas as pd
 
 
 def add_nonfiler(cpsrets, nonfiler):
-    nonfiler = pd.read_csv('cpsnonf2014.csv')
-    cpsrets = pd.read_csv('cpsrets.csv')
+    # nonfiler = pd.read_csv('cpsnonf2014.csv')
+    # cpsrets = pd.read_csv('cpsrets.csv')
 
     ifdept = nonfiler['ifdept']
     js = nonfiler['js']
@@ -3,33 +3,69 @@ Create tax units from the processed CPS data
 Input file: CPSRETS2014.csv
 """
 
-# import pandas as pd
 import numpy as np
+import pandas as pd
+from partition import partition
 
 
-def adjfilst(cps_recs):
+# Probability that a unit below the filing thresholds files anyway, for
+# units with and without wages
+WAGE_FILING = 0.84
+NO_WAGE_FILING = 0.54
+
+
+def filing_draws(cps_recs, replicates=1, seed=142):
+    """
+    Draw which tax units file a return. Units required to file always file,
+    the others file with probability WAGE_FILING or NO_WAGE_FILING
+
+    Parameters
+    ----------
+    cps_recs: DataFrame of tax units holding filst and was
+    replicates: number of independent draws
+    seed: seed of the random numbers. Each replicate uses its own
+          RandomState, seeded from a sequence drawn from seed, so a
+          replicate does not change with the number of replicates drawn
+          and the global np.random state is not used
+
+    Returns
+    -------
+    Boolean DataFrame with one row per unit and one column per replicate,
+    True for the units that file
     """
+    required = cps_recs['filst'].values == 1
+    prob = np.where(cps_recs['was'].values > 0, WAGE_FILING, NO_WAGE_FILING)
+    seeds = np.random.RandomState(seed).randint(0, 2 ** 31 - 1,
+                                                 size=replicates)
+    draws = np.empty((len(cps_recs), replicates), dtype=bool)
+    for k, replicate in enumerate(seeds):
+        uniform = np.random.RandomState(replicate).uniform(0, 1,
+                                                           len(cps_recs))
+        draws[:, k] = required | (uniform <= prob)
+    return pd.DataFrame(draws, index=cps_recs.index)
+
+
+def adjfilst(cps_recs, seed=142):
+    """
+    Impute which tax units below the filing thresholds file a return and
+    split the units into filers and nonfilers
+
+    Parameters
+    ----------
+    cps_recs: DataFrame of tax units
+    seed: seed of the random numbers
+
+    Returns
+    -------
+    PartitionViews of filers and nonfilers
     """
     # cps_recs = pd.read_csv('CPSRETS2014.csv')
-    cps_recs['case1'] = np.where(((cps_recs['filst'] == 0) &
-                                 (cps_recs['was'] > 0)), 1, 0)
-    cps_recs['case2'] = np.where(((cps_recs['filst'] == 0) &
-                                  (cps_recs['was'] <= 0)), 1, 0)
-    np.random.seed(142)
-    cps_recs['z1'] = cps_recs['case1'].apply(lambda x: np.random.uniform(0, 1)
-                                             if x == 1 else x)
-    np.random.seed(1)
-    cps_recs['z2'] = cps_recs['case2'].apply(lambda x: np.random.uniform(0, 1)
-                                             if x == 1 else x)
-    # TODO: check the probability
-    selected = (cps_recs['z1'] <= 0.84) | (cps_recs['z2'] <= 0.54)
-    # cps_recs['filst'][selected] = 1
-    cps_recs['filst'] = np.where(selected, 1, cps_recs['filst'])
-    cps_recs.drop(['case1', 'case2'], axis=1, inplace=True)
+    files = filing_draws(cps_recs, 1, seed).values[:, 0]
+    cps_recs['filst'] = files.astype(np.int64)
     cps_recs['cpsseq'] = cps_recs.index + 1
 
-    filers = cps_recs.copy()[(cps_recs['filst'] == 1)]
-    nonfilers = cps_recs.copy()[(cps_recs['filst'] == 0)]
+    # Both partitions share the rows of cps_recs
+    filers, nonfilers = partition(cps_recs, files)
 
     filers.to_csv('cpsrets14.csv', index=False)
     nonfilers.to_csv('cpsnonf2014.csv', index=False)
@@ -0,0 +1,241 @@
+"""
+Content addressed cache for parsed tables
+Each table is stored as a directory holding one .npy file per column, so
+numeric columns can be memory mapped when the table is loaded again.
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+
+
+def file_digest(path, blocksize=1 << 20):
+    """
+    SHA-1 digest of the contents of a file
+
+    Parameters
+    ----------
+    path: path to the file
+    blocksize: number of bytes read at a time
+
+    Returns
+    -------
+    Hexadecimal digest
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_frame(frame, path):
+    """
+    Write a DataFrame as a directory of column files
+
+    The table is written to a temporary directory that is renamed once
+    complete, so a partially written table is never picked up.
+
+    Parameters
+    ----------
+    frame: DataFrame to store
+    path: directory to create
+    """
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    os.makedirs(tmp)
+    columns = list()
+    for i, name in enumerate(frame.columns):
+        values = frame.iloc[:, i]
+        entry = {'name': name, 'file': 'c{}.npy'.format(i)}
+        if str(values.dtype) == 'category':
+            entry['kind'] = 'category'
+            entry['categories'] = 'c{}_categories.npy'.format(i)
+            np.save(os.path.join(tmp, entry['file']), values.cat.codes.values)
+            np.save(os.path.join(tmp, entry['categories']),
+                    np.asarray(values.cat.categories))
+        elif values.dtype.kind in 'biuf':
+            entry['kind'] = 'array'
+            np.save(os.path.join(tmp, entry['file']), values.values)
+        else:
+            # Strings are stored as fixed width unicode, anything else is
+            # pickled
+            strings = all(isinstance(val, str) for val in values)
+            entry['kind'] = 'str' if strings else 'object'
+            data = np.asarray(values, dtype='U' if strings else object)
+            np.save(os.path.join(tmp, entry['file']), data,
+                    allow_pickle=not strings)
+        columns.append(entry)
+    index = None
+    if not frame.index.equals(pd.RangeIndex(len(frame))):
+        index = 'index.npy'
+        np.save(os.path.join(tmp, index), frame.index.values)
+    with open(os.path.join(tmp, 'table.json'), 'w') as f:
+        json.dump({'columns': columns, 'index': index, 'rows': len(frame)},
+                  f)
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        # Another process stored the same table first
+        shutil.rmtree(tmp)
+        if not os.path.isdir(path):
+            raise
+
+
+def load_frame(path, mmap=True):
+    """
+    Read a table written by save_frame
+
+    Parameters
+    ----------
+    path: directory holding the table
+    mmap: memory map numeric columns instead of reading them into memory
+
+    Returns
+    -------
+    DataFrame
+    """
+    with open(os.path.join(path, 'table.json')) as f:
+        table = json.load(f)
+    mode = 'r' if mmap else None
+    data = OrderedDict()
+    for entry in table['columns']:
+        name = str(entry['name'])
+        filename = os.path.join(path, entry['file'])
+        if entry['kind'] == 'array':
+            # A plain array view keeps the data memory mapped
+            data[name] = np.asarray(np.load(filename, mmap_mode=mode))
+        elif entry['kind'] == 'category':
+            categories = np.load(os.path.join(path, entry['categories']),
+                                 allow_pickle=True)
+            data[name] = pd.Categorical.from_codes(np.load(filename),
+                                                   categories)
+        elif entry['kind'] == 'str':
+            data[name] = np.load(filename).astype(object)
+        else:
+            data[name] = np.load(filename, allow_pickle=True)
+    index = None
+    if table['index'] is not None:
+        index = np.load(os.path.join(path, table['index']),
+                        allow_pickle=True)
+    elif not data:
+        index = pd.RangeIndex(table['rows'])
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+def dir_size(path):
+    """
+    Total size in bytes of the files in a directory tree
+    """
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            size += os.path.getsize(os.path.join(root, name))
+    return size
+
+
+class ParseCache(object):
+    """
+    Directory of tables keyed by a hash of the inputs that produced them
+    """
+    def __init__(self, path, max_bytes=None, max_age=None):
+        """
+        Parameters
+        ----------
+        path: directory holding the cached tables
+        max_bytes: total size the cache may use. The least recently used
+                   tables are removed once it is exceeded
+        max_age: number of days a table is kept after it was last used
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    @staticmethod
+    def key(*parts):
+        """
+        Hash the inputs identifying a table into a cache key
+        """
+        digest = hashlib.sha1()
+        for part in parts:
+            digest.update(str(part).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def entry(self, key):
+        """
+        Directory holding the table stored under key
+        """
+        return os.path.join(self.path, key)
+
+    def get(self, key, mmap=True):
+        """
+        Load the table stored under key
+
+        Parameters
+        ----------
+        key: cache key
+        mmap: memory map numeric columns
+
+        Returns
+        -------
+        DataFrame, or None if no table is stored under key
+        """
+        path = self.entry(key)
+        if not os.path.isdir(path):
+            return None
+        # The modification time records when the table was last used
+        os.utime(path, None)
+        return load_frame(path, mmap)
+
+    def put(self, key, frame, replace=False):
+        """
+        Store a table under key and evict old tables
+
+        Parameters
+        ----------
+        key: cache key
+        frame: DataFrame to store
+        replace: overwrite a table already stored under key
+        """
+        path = self.entry(key)
+        if replace and os.path.isdir(path):
+            # The new table is complete before the old one is removed
+            staged = '{}.{}.new.tmp'.format(path, os.getpid())
+            old = '{}.{}.old.tmp'.format(path, os.getpid())
+            save_frame(frame, staged)
+            os.rename(path, old)
+            os.rename(staged, path)
+            shutil.rmtree(old)
+        elif not os.path.isdir(path):
+            save_frame(frame, path)
+        os.utime(path, None)
+        self.evict()
+
+    def evict(self):
+        """
+        Remove tables that are older than max_age, then the least recently
+        used tables until the cache fits in max_bytes
+        """
+        now = time.time()
+        entries = list()
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            if not os.path.isdir(path) or name.endswith('.tmp'):
+                continue
+            entries.append((os.path.getmtime(path), dir_size(path), path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for used, size, path in entries:
+            too_old = (self.max_age is not None and
+                       now - used > self.max_age * 86400)
+            too_big = self.max_bytes is not None and total > self.max_bytes
+            if not too_old and not too_big:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
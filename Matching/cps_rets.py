@@ -2,9 +2,445 @@
 Class for creating CPS tax units
 """
 
+from array import array
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import os
+import shutil
+from multiprocessing import Pool
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
+from cache import ParseCache, load_frame, save_frame
+from profiler import StageProfiler
+
+# Version of the tax unit rules, part of the key of cached tax units
+UNITS_VERSION = 1
+
+# Thresholds used by the filing requirement tests
+FILING_THRESHOLDS = OrderedDict([
+    # Gross income thresholds
+    ('single', 10150), ('single65', 11700), ('hoh', 13050), ('hoh65', 14600),
+    ('joint', 20300), ('joint65one', 21500), ('joint65both', 22700),
+    # Wage thresholds for non-dependent filers
+    ('wage1', 1000), ('wage2', 250), ('wage2nk', 1000),
+    # Dependent exemption
+    ('depExempt', 3950)])
+
+# Generation of a person relative to the reference person of the household,
+# by relationship code, used to find the children of a tax unit head
+GENERATIONS = {5: -1, 7: -2, 8: 1, 9: 0, 11: -1}
+
+# Person variables reported in the icps and jcps items for the head and the
+# spouse of each unit
+HEALTH = ('care', 'caid', 'oth', 'hi', 'priv', 'paid', 'filestat', 'agi')
+INCOME = ('wsal_val', 'int_val', 'div_val', 'alm_val', 'semp_val', 'rtm_val',
+          'rnt_val', 'frse_val', 'uc_val', 'ss_val')
+SOURCES = ('ret_val1', 'ret_sc1', 'ret_val2', 'ret_sc2', 'dis_val1',
+           'dis_sc1', 'dis_val2', 'dis_sc2', 'sur_val1', 'sur_sc1',
+           'sur_val2', 'sur_sc2', 'vet_typ1', 'vet_typ2', 'vet_typ3',
+           'vet_typ4', 'vet_typ5', 'vet_val')
+HOUSEHOLD = ('fhip_val', 'fmoop', 'fotc_val', 'fmed_val', 'hmcaid',
+             'hrwicyn', 'hfdval', 'care_val')
+PROGRAMS = ('paw_val', 'mcaid', 'pchip', 'wicyn', 'ssi_val', 'hi_yn', 'hiown',
+            'hiemp', 'hipaid', 'emcontrb', 'hi', 'hityp', 'paid', 'priv',
+            'prityp', 'ss_val', 'uc_val', 'mcare', 'wc_val', 'vet_val')
+
+
+def person_items(kind, names):
+    """
+    Items taking each of the variables in names from the head or the spouse
+    """
+    return [(kind, name) for name in names]
+
+
+# Source of the icps and jcps items. 'head' and 'spouse' take a CPS variable
+# of the head or the spouse of the unit, and are missing for units without a
+# spouse. 'couple' adds a variable of the head to one of the spouse. 'unit'
+# takes a variable of the tax unit. 'family' takes a household variable for
+# units that are not dependent filers. 'zero' is always 0 and 'spouse-zero'
+# is 0 for units with a spouse
+ICPS = ([('head', 'a_age'), ('spouse', 'a_age')] +
+        person_items('unit', ('depage1', 'depage2', 'depage3', 'depage4',
+                              'depage5', 'youngest', 'oldest')) +
+        [('zero', None)] * 3 + [('spouse-zero', None)] * 3 +
+        [('zero', None)] * 2 + [('spouse-zero', None)] * 2 +
+        [('zero', None), ('spouse-zero', None),
+         ('couple', ('ssi_val', 'ss_val')), ('couple', ('paw_val', 'paw_val')),
+         ('couple', ('wc_val', 'wc_val')), ('couple', ('vet_val', 'vet_val')),
+         ('zero', None), ('couple', ('dsab_val', 'dsab_val')),
+         ('couple', ('ss_val', 'ss_val')), ('unit', 'zowner'),
+         ('unit', 'wshare')] +
+        person_items('unit', ('primary', 'primary', 'primary')) +
+        [('zero', None)] +
+        person_items('head', ('ljcw', 'wemind', 'penatvty')) +
+        [('spouse-zero', None)] +
+        person_items('spouse', ('ljcw', 'wemind', 'penatvty')) +
+        person_items('head', ('a_hga', 'a_sex')) +
+        person_items('spouse', ('a_hga', 'a_sex')) +
+        person_items('unit', ('majorindustry', 'senonfarm', 'sefarm')))
+JCPS = (person_items('head', ('a_age',) + HEALTH) + [('zero', None)] +
+        person_items('spouse', ('a_age',) + HEALTH) + [('spouse-zero', None)] +
+        person_items('head', INCOME) + person_items('spouse', INCOME) +
+        person_items('head', SOURCES[0:4]) +
+        person_items('spouse', SOURCES[0:4]) +
+        person_items('head', SOURCES[4:8]) +
+        person_items('spouse', SOURCES[4:8]) +
+        person_items('head', SOURCES[8:12]) +
+        person_items('spouse', SOURCES[8:12]) +
+        person_items('head', SOURCES[12:18]) +
+        person_items('spouse', SOURCES[12:18]) +
+        person_items('family', HOUSEHOLD) +
+        person_items('head', PROGRAMS) + person_items('spouse', PROGRAMS))
+# Columns of the tax units file, in order
+OUTPUT = ([('xagex', 'unit', 'agede'), ('hhid', 'head', 'h_seq')] +
+          [(name, 'unit', name)
+           for name in ('oldest', 'youngest', 'xxocah')] +
+          [('xxpcawh', 'zero', None)] +
+          [(name, 'unit', name)
+           for name in ('xxoodep', 'xxopar', 'xxtot', 'xstate', 'xregion',
+                        'xschb', 'xschf', 'xsche', 'xschc', 'xhid', 'xfid',
+                        'xpid')] +
+          [('h_seq', 'head', 'h_seq'), ('peridnum', 'head', 'peridnum')] +
+          [(name, 'unit', name)
+           for name in ('js', 'ifdept', 'agede', 'depne', 'cahe', 'ageh',
+                        'ages', 'was', 'intst', 'dbe', 'alimony', 'bil',
+                        'pensions', 'rents', 'fil', 'ucomp', 'socsec',
+                        'returns', 'wt', 'zifdep', 'zntdep', 'zhhinc',
+                        'zagesp', 'zoldes', 'zyoung', 'zworkc', 'zsocse',
+                        'zssinc', 'zpubas', 'zvetbe', 'zfinas', 'zowner',
+                        'zwaspt', 'zwassp', 'wasp', 'wass')] +
+          [('icps' + str(i + 1), kind, source)
+           for i, (kind, source) in enumerate(ICPS)] +
+          [('jcps' + str(i + 1), kind, source)
+           for i, (kind, source) in enumerate(JCPS)] +
+          [('zdepin', 'unit', 'zdepin')])
+
+
+def cps_values(cps, name):
+    """
+    Values of a CPS variable as 64 bit numbers, or objects for strings
+    """
+    values = cps[name]
+    if values.dtype.kind in 'iu':
+        return values.values.astype(np.int64)
+    if values.dtype.kind == 'f':
+        return values.values.astype(np.float64)
+    return np.asarray(values, dtype=object)
+
+
+def masked(values, mask):
+    """
+    Values where mask is set and NaN elsewhere. Integers are only converted
+    to floats if some value is missing
+    """
+    if mask.all():
+        return values
+    values = values.astype(np.float64)
+    values[~mask] = np.nan
+    return values
+
+
+def filing_status(units, scenarios=None):
+    """
+    Determines whether or not each tax unit files a return under each of a
+    set of threshold scenarios, using five tests
+    1. Wage test. If anyone in the tax unit had wage and salary income,
+       the unit is deemed to file a return
+    2. Gross income test. The income thresholds in the 1040 filing
+       requirements are used to determine if the tax unit has to file.
+    3. Dependent filer test. Individuals who are claimed as dependents, but
+       are required to file a return
+    4. Random selection
+    5. Negative income
+
+    Parameters
+    ----------
+    units: DataFrame of tax units, as created by Returns.computation
+    scenarios: DataFrame with one row per scenario and a column for each
+               threshold in FILING_THRESHOLDS to change. Thresholds
+               without a column keep their default value, and a column
+               that is not a threshold raises ValueError. Only the
+               defaults are used if None
+
+    Returns
+    -------
+    DataFrame with a row for each unit and a column for each scenario,
+    holding 1 for units that file and 0 for the others
+    """
+    if scenarios is None:
+        scenarios = pd.DataFrame([FILING_THRESHOLDS])
+    unknown = [name for name in scenarios.columns
+               if name not in FILING_THRESHOLDS]
+    if unknown:
+        raise ValueError('Unknown filing thresholds: {}'.format(
+            ', '.join(str(name) for name in unknown)))
+    # Thresholds as rows, so they broadcast against the units as columns
+    limits = dict()
+    for name, value in FILING_THRESHOLDS.items():
+        if name in scenarios:
+            limits[name] = scenarios[name].values[np.newaxis, :]
+        else:
+            limits[name] = np.full((1, len(scenarios)), value)
+    js = units['js'].values[:, np.newaxis]
+    was = units['was'].values[:, np.newaxis]
+    depne = units['depne'].values[:, np.newaxis]
+    agede = units['agede'].values[:, np.newaxis]
+    income = units['income'].values[:, np.newaxis]
+    exempt = limits['depExempt'] * depne
+    filst = np.zeros((len(units), len(scenarios)), dtype=np.int8)
+
+    # Wage test
+    filst = np.where((js == 1) & (was >= limits['wage1']), 1, filst)
+    filst = np.where((js == 2) & (depne > 0) &
+                     ((was >= limits['wage2']) | (was >= limits['wage2nk'])),
+                     1, filst)
+
+    # Gross income test
+    amount = np.where(agede != 0, limits['single65'] - exempt,
+                      limits['single'] - exempt)
+    filst = np.where((js == 1) & (income >= amount), 1, filst)
+    amount = np.where(agede == 1, limits['joint65one'] - exempt,
+                      limits['joint'] - exempt)
+    amount = np.where(agede == 1, limits['joint65both'] - exempt, amount)
+    filst = np.where((js == 2) & (income >= amount), 1, filst)
+    amount = np.where(agede != 0, limits['hoh65'] - exempt, limits['hoh'])
+    filst = np.where((js == 3) & (income >= amount), 1, filst)
+
+    # Dependent filer test
+    dependent = units['ifdept'].values.astype(bool)[:, np.newaxis]
+    filst = np.where(dependent, 1, filst)
+    # Random selection
+    filst = np.where((js == 3) & (agede > 0) & (income < 6500) & (depne > 0),
+                     0, filst)
+    # Negative incomet test
+    negative = ((units['bil'].values < 0) | (units['fil'].values < 0) |
+                (units['rents'].values < 0))[:, np.newaxis]
+    filst = np.where(negative, 1, filst)
+    return pd.DataFrame(filst.astype(np.int8), index=units.index,
+                        columns=scenarios.index)
+
+
+class TaxUnit(object):
+    """
+    Tax unit built around the record of its head
+    """
+    # Variables computed for the unit when it is created
+    variables = ('js', 'ifdept', 'agede', 'cahe', 'ageh', 'ages', 'was',
+                 'intst', 'dbe', 'alimony', 'bil', 'pensions', 'rents', 'fil',
+                 'ucomp', 'socsec', 'returns', 'wt', 'zifdep', 'zntdep',
+                 'zhhinc', 'zagept', 'zagesp', 'zoldes', 'zyoung', 'zworkc',
+                 'zsocse', 'zssinc', 'zpubas', 'zvetbe', 'zchsup', 'zfinas',
+                 'zdepin', 'zowner', 'zwaspt', 'zwassp', 'wasp', 'wass',
+                 'xregion', 'xschb', 'xschf', 'xsche', 'xschc', 'xhid', 'xfid',
+                 'xpid', 'depne', 'totincx', 'xstate', 'wshare', 'primary',
+                 'majorindustry', 'senonfarm', 'sefarm')
+    __slots__ = (('head', 'position', 'spouse', 't_flag', 'deps', 'depages') +
+                 variables)
+
+    def __init__(self, head, position, spouse=None):
+        """
+        Parameters
+        ----------
+        head: dictionary record for the head of the unit
+        position: position of the head in the household
+        spouse: position of the spouse in the household, if any
+        """
+        self.head = head
+        self.position = position
+        self.spouse = spouse
+        self.t_flag = True  # tax unit flag
+        # Positions in the household and ages of the dependents. depne is
+        # kept equal to the number of dependents
+        self.deps = array('i')
+        self.depages = array('i')
+
+
+class UnitColumns(object):
+    """
+    Preallocated columns the tax units are written to by Returns.output
+    """
+    # Variables of the units stored as floats or booleans. The others hold
+    # integers, or NaN where they do not apply
+    floats = ('cahe', 'wt', 'wshare')
+    bools = ('ifdept', 'returns', 'zifdep')
+    # Variables found from the dependents when a unit is output
+    dependents = ('oldest', 'youngest', 'xxocah', 'xxoodep', 'xxopar',
+                  'xxtot', 'depage1', 'depage2', 'depage3', 'depage4',
+                  'depage5')
+
+    def __init__(self, capacity):
+        """
+        Parameters
+        ----------
+        capacity: largest number of units that can be written
+        """
+        self.size = 0
+        # Rows of the head and the spouse in the CPS file, -1 if there is
+        # no spouse
+        self.head = np.empty(capacity, dtype=np.int64)
+        self.spouse = np.empty(capacity, dtype=np.int64)
+        self.values = dict()
+        for name in TaxUnit.variables + self.dependents:
+            dtype = bool if name in self.bools else np.float64
+            self.values[name] = np.empty(capacity, dtype=dtype)
+
+    def add(self, unit, start):
+        """
+        Write the variables of a tax unit
+
+        Parameters
+        ----------
+        unit: TaxUnit
+        start: row of the first member of the household in the CPS file
+
+        Returns
+        -------
+        Row the unit was written to
+        """
+        row = self.size
+        self.size += 1
+        self.head[row] = start + unit.position
+        if unit.spouse is None:
+            self.spouse[row] = -1
+        else:
+            self.spouse[row] = start + unit.spouse
+        for name in TaxUnit.variables:
+            self.values[name][row] = getattr(unit, name)
+        return row
+
+    def extend(self, rows, values):
+        """
+        Write the variables of tax units without a spouse in bulk
+
+        Parameters
+        ----------
+        rows: rows of the heads in the CPS file
+        values: dictionary holding an array for each unit variable and
+                each variable found from the dependents
+        """
+        stop = self.size + len(rows)
+        self.head[self.size:stop] = rows
+        self.spouse[self.size:stop] = -1
+        for name, column in self.values.items():
+            column[self.size:stop] = values[name]
+        self.size = stop
+
+    def column(self, name):
+        """
+        Values of a unit variable for the units written so far
+        """
+        values = self.values[name][:self.size]
+        if (name in self.floats or name in self.bools or
+                np.isnan(values).any()):
+            return values
+        return values.astype(np.int64)
+
+    def frame(self, cps):
+        """
+        Build the tax units file from the units written so far
+
+        Parameters
+        ----------
+        cps: CPS file the rows of the heads and spouses refer to
+
+        Returns
+        -------
+        DataFrame of tax units
+        """
+        size = self.size
+        # Units are put in the order of their heads in the file, which is
+        # the order they are created in
+        order = np.argsort(self.head[:size], kind='mergesort')
+        self.head[:size] = self.head[:size][order]
+        self.spouse[:size] = self.spouse[:size][order]
+        for values in self.values.values():
+            values[:size] = values[:size][order]
+        head = self.head[:size]
+        married = self.spouse[:size] >= 0
+        spouse = np.where(married, self.spouse[:size], 0)
+        filer = ~self.values['ifdept'][:size]
+        data = OrderedDict()
+        for name, kind, source in OUTPUT:
+            if kind == 'unit':
+                data[name] = self.column(source)
+            elif kind == 'head':
+                data[name] = cps_values(cps, source)[head]
+            elif kind == 'spouse':
+                data[name] = masked(cps_values(cps, source)[spouse], married)
+            elif kind == 'couple':
+                data[name] = (cps_values(cps, source[0])[head] +
+                              np.where(married,
+                                       cps_values(cps, source[1])[spouse], 0))
+            elif kind == 'family':
+                data[name] = masked(cps_values(cps, source)[head], filer)
+            elif kind == 'spouse-zero':
+                data[name] = masked(np.zeros(size, dtype=np.int64), married)
+            else:
+                data[name] = np.zeros(size, dtype=np.int64)
+        data['income'] = sum(data[name] for name in
+                             ('was', 'intst', 'dbe', 'alimony', 'bil',
+                              'pensions', 'rents', 'fil', 'ucomp', 'socsec'))
+        return pd.DataFrame(data)
+
+
+def stream_units(chunks, workers=1, thresholds=None):
+    """
+    Create tax units from a CPS file read in chunks, such as those of
+    cpsmar.read_cps_chunks, one chunk at a time. Only one chunk and its tax
+    units are held in memory at a time
+
+    Parameters
+    ----------
+    chunks: iterable of CPS DataFrames, each holding complete households
+    workers: number of processes used to create the tax units of a chunk
+    thresholds: dictionary of thresholds to change from their defaults,
+                such as {'single': 10500}
+
+    Returns
+    -------
+    Generator of DataFrames holding the tax units of each chunk. The index
+    continues from one chunk to the next
+    """
+    rows = 0
+    for chunk in chunks:
+        returns = Returns(chunk)
+        for name, value in (thresholds or dict()).items():
+            setattr(returns, name, value)
+        units = returns.computation(workers=workers, export=False)
+        units.index = pd.RangeIndex(rows, rows + len(units))
+        rows += len(units)
+        yield units
+
+
+def ranges(starts, sizes):
+    """
+    Concatenation of the ranges of the given starts and sizes
+    """
+    return (np.repeat(starts - np.cumsum(sizes) + sizes, sizes) +
+            np.arange(sizes.sum()))
+
+
+def shard_units(shard):
+    """
+    Create the tax units for one block of households
+
+    Parameters
+    ----------
+    shard: tuple holding a Returns object whose CPS file is the block of
+           households, and the first and one past the last row of each
+           household in the block
+
+    Returns
+    -------
+    DataFrame of tax units, and the StageProfiler of the block or None
+    """
+    returns, starts, ends = shard
+    if returns.profiler is not None:
+        returns.profiler.attach(returns)
+    return returns.process(returns.cps, starts, ends), returns.profiler
 
 
 class Returns(object):
@@ -23,28 +459,26 @@ class Returns(object):
         self.nunits = 0
 
         # Set filing thresholds
-        self.single = 10150
-        self.single65 = 11700
-        self.hoh = 13050
-        self.hoh65 = 14600
-        self.joint = 20300
-        self.joint65one = 21500
-        self.joint65both = 22700
+        for name, value in FILING_THRESHOLDS.items():
+            setattr(self, name, value)
         self.widow = 16350
         self.widow65 = 17550
         self.depwages = 0
         self.depTotal = 1000
-        # Wage thresholds for non-dependent filers
-        self.wage1 = 1000
-        self.wage2 = 250
-        self.wage2nk = 1000
         self.wage3 = 1
-        # Dependent exemption
-        self.depExempt = 3950
 
-        # Lists to hold tax units in each household
+        # List to hold tax units in each household
         self.house_units = list()
-        self.tax_units = list()
+        # Positions of the potential dependents of each household member
+        self.candidates = list()
+        # Position of each line number in the household
+        self.lines = dict()
+        # Checkpoint options, set by computation
+        self.checkpoint = None
+        self.resume = False
+        self.every = 1000
+        # StageProfiler timing the stages, set by computation
+        self.profiler = None
 
         # Set flags in CPS file
         self.cps['h_flag'] = False  # Tax unit head flag
@@ -52,32 +486,340 @@ class Returns(object):
         self.cps['d_flag'] = False  # Tax Unit Dependent flag
         self.cps['flag'] = False  # General flag
 
-    def computation(self):
+    def computation(self, workers=1, cache=None, checkpoint=None,
+                    resume=False, every=1000, export=True, profiler=None):
         """
         Construct tax units based on type of household
         1. Single person living alone
         2. Persons living in group quarters
         3. All other family structures
 
+        Parameters
+        ----------
+        workers: number of processes used to create the tax units. The
+                 households are split into contiguous blocks that are
+                 processed in parallel, and the units are put back in
+                 household order
+        cache: ParseCache, or path to its directory, holding the tax units
+               of a previous run. Only the households whose records
+               changed since are processed again. All households are
+               processed when the thresholds change
+        checkpoint: directory where the tax units are saved after each block
+                    of households, so an interrupted run can be resumed.
+                    It must be empty or hold a previous checkpoint
+        resume: keep the blocks already saved in checkpoint instead of
+                starting over. The checkpoint must come from a run on the
+                same records with the same thresholds
+        every: number of households in each block saved to checkpoint
+        export: write the tax units to CPSRETS2014.csv
+        profiler: StageProfiler that times each stage of the tax unit
+                  creation. Nothing is timed when None
+
         Returns
         -------
         CPS Tax Units file
         """
-        # Extract each household from full CPS file
+        # Alimony is not counted. The loop that used to copy oi_off == 20
+        # into alm_val wrote to a copy of each row, so it had no effect
         # TODO: Check if this is actually needed
         self.cps['alm_val'] = 0
-        for index, row in self.cps.iterrows():
-            if row['oi_off'] == 20:
-                row['alm_val'] = row['oi_off']
+        # Total income of each person
+        self.cps['income'] = self.cps[list(INCOME)].sum(axis=1)
+
+        # Sort the file once so each household is a contiguous block of rows
+        cps, starts, ends = self.households()
+        # Options used whenever tax units are created
+        self.checkpoint = checkpoint
+        self.resume = resume
+        self.every = every
+        if profiler is not None:
+            profiler.attach(self)
+        pool = None
+        try:
+            # One pool of workers serves every block of households
+            if workers > 1:
+                pool = Pool(workers)
+            if cache is not None:
+                final_output = self.update_units(cps, starts, ends, cache,
+                                                 workers, pool)
+            else:
+                final_output = self.build_units(cps, starts, ends, workers,
+                                                pool)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+            # The timed methods never outlive the run
+            if profiler is not None:
+                profiler.detach(self)
+        if export:
+            final_output.to_csv('CPSRETS2014.csv', index=False)
+        return final_output
+
+    def create_units(self, cps, starts, ends, workers=1, pool=None):
+        """
+        Create the tax units of a set of households
 
-        for num in tqdm(self.h_nums):
+        Parameters
+        ----------
+        cps: CPS file sorted by household and line number
+        starts: first row of each household
+        ends: one past the last row of each household
+        workers: number of processes used
+        pool: Pool of worker processes to use. A pool is created for this
+              call when None
+
+        Returns
+        -------
+        DataFrame of tax units
+        """
+        if workers > 1:
+            # Each worker gets a copy of this object holding only its own
+            # households
+            bounds = np.linspace(0, len(starts), workers + 1).astype(int)
+            shards = list()
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                if lo == hi:
+                    continue
+                shard = copy.copy(self)
+                shard.cps = cps.iloc[starts[lo]:ends[hi - 1]]
+                shard.house_units = list()
+                if self.profiler is not None:
+                    # Timed methods cannot be sent to a worker, each one
+                    # times its block with its own profiler
+                    self.profiler.detach(shard)
+                    shard.profiler = StageProfiler()
+                shards.append((shard, starts[lo:hi] - starts[lo],
+                               ends[lo:hi] - starts[lo]))
+            if pool is not None:
+                pieces = pool.map(shard_units, shards)
+            else:
+                pool = Pool(workers)
+                try:
+                    pieces = pool.map(shard_units, shards)
+                finally:
+                    pool.close()
+                    pool.join()
+            for _, profiler in pieces:
+                if profiler is not None:
+                    self.profiler.merge(profiler)
+            return pd.concat([units for units, _ in pieces],
+                             ignore_index=True)
+        return self.process(cps, starts, ends)
+
+    def checkpoint_units(self, cps, starts, ends, workers=1, pool=None):
+        """
+        Create the tax units of a set of households in blocks of self.every
+        households, saving each block to self.checkpoint
+
+        Parameters
+        ----------
+        cps: CPS file sorted by household and line number
+        starts: first row of each household
+        ends: one past the last row of each household
+        workers: number of processes used
+        pool: Pool of worker processes shared by all blocks
+
+        Returns
+        -------
+        DataFrame of tax units
+        """
+        if len(starts) == 0:
+            # Nothing to save, the units are built as without a checkpoint
+            return self.create_units(cps, starts, ends)
+        path = self.checkpoint
+        hashes = pd.util.hash_pandas_object(cps, index=False).values
+        run = {'key': self.cache_key(cps), 'every': self.every,
+               'records': hashlib.sha1(hashes).hexdigest()}
+        filename = os.path.join(path, 'run.json')
+        if (os.path.isdir(path) and os.listdir(path) and
+                not os.path.isfile(filename)):
+            # Never clear a directory this method did not write
+            raise ValueError('Checkpoint {} is not empty and holds no '
+                             'run.json'.format(path))
+        if os.path.isfile(filename) and not self.resume:
+            # Only the files of the previous run are removed
+            for name in os.listdir(path):
+                entry = os.path.join(path, name)
+                if name.startswith('part') and os.path.isdir(entry):
+                    shutil.rmtree(entry)
+            os.remove(filename)
+        if os.path.isfile(filename):
+            with open(filename) as f:
+                if json.load(f) != run:
+                    raise ValueError('Checkpoint {} was written by another '
+                                     'run'.format(path))
+        else:
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            with open(filename, 'w') as f:
+                json.dump(run, f)
+
+        pieces = list()
+        for block, lo in enumerate(range(0, len(starts), self.every)):
+            hi = min(lo + self.every, len(starts))
+            part = os.path.join(path, 'part{:05d}'.format(block))
+            if not os.path.isdir(part):
+                units = self.create_units(cps.iloc[starts[lo]:ends[hi - 1]],
+                                          starts[lo:hi] - starts[lo],
+                                          ends[lo:hi] - starts[lo], workers,
+                                          pool)
+                save_frame(units, part)
+            pieces.append(load_frame(part))
+        return pd.concat(pieces, ignore_index=True)
+
+    def build_units(self, cps, starts, ends, workers=1, pool=None):
+        """
+        Create the tax units of a set of households, saving them to
+        self.checkpoint if it is set
+
+        Parameters
+        ----------
+        cps: CPS file sorted by household and line number
+        starts: first row of each household
+        ends: one past the last row of each household
+        workers: number of processes used
+        pool: Pool of worker processes shared by all blocks
+
+        Returns
+        -------
+        DataFrame of tax units
+        """
+        if self.checkpoint is not None:
+            return self.checkpoint_units(cps, starts, ends, workers, pool)
+        return self.create_units(cps, starts, ends, workers, pool)
+
+    def cache_key(self, cps):
+        """
+        Key of the tax units created from the variables of cps with the
+        thresholds of this object in a ParseCache
+        """
+        thresholds = [(name, getattr(self, name))
+                      for name in list(FILING_THRESHOLDS) +
+                      ['widow', 'widow65', 'depwages', 'depTotal', 'wage3']]
+        return ParseCache.key('tax-units', UNITS_VERSION, thresholds,
+                              list(cps.columns))
+
+    def update_units(self, cps, starts, ends, cache, workers=1, pool=None):
+        """
+        Create the tax units of the households that changed since the units
+        were stored in cache, and splice them into the stored units
+
+        Parameters
+        ----------
+        cps: CPS file sorted by household and line number
+        starts: first row of each household
+        ends: one past the last row of each household
+        cache: ParseCache, or path to its directory
+        workers: number of processes used
+        pool: Pool of worker processes shared by all blocks
+
+        Returns
+        -------
+        DataFrame of tax units
+        """
+        if len(starts) == 0:
+            # Nothing to store, the units are built as without a cache
+            return self.create_units(cps, starts, ends)
+        if not isinstance(cache, ParseCache):
+            cache = ParseCache(cache)
+        key = self.cache_key(cps)
+        # Each household is identified by a hash of its records
+        hashes = pd.util.hash_pandas_object(cps, index=False).values
+        house_keys = np.array([hashlib.sha1(hashes[start:end]).hexdigest()
+                               for start, end in zip(starts, ends)],
+                              dtype=object)
+        stored = cache.get(key, mmap=False)
+        if stored is None:
+            stored = pd.DataFrame(columns=['house'])
+        # The units of each household are contiguous in the stored table
+        stored_keys = np.asarray(stored['house'], dtype=object)
+        first = np.flatnonzero(np.append(True, stored_keys[1:] !=
+                                         stored_keys[:-1]))[:len(stored)]
+        last = np.append(first[1:], len(stored))
+        found = dict(zip(stored_keys[first], zip(first, last)))
+
+        changed = np.array([house not in found for house in house_keys],
+                           dtype=bool)
+        pieces = [stored] if len(stored) else []
+        if changed.any():
+            sizes = ends[changed] - starts[changed]
+            new_cps = cps.iloc[ranges(starts[changed], sizes)]
+            new_ends = np.cumsum(sizes)
+            units = self.build_units(new_cps, new_ends - sizes, new_ends,
+                                     workers, pool)
+            # Units are matched to their household through h_seq
+            new_keys = pd.Series(
+                house_keys[changed], index=cps['h_seq'].values[starts[changed]]
+            ).reindex(units['hhid'].values).values
+            units = pd.concat([units, pd.DataFrame({'house': new_keys},
+                                                   index=units.index)],
+                              axis=1)
+            new_first = np.flatnonzero(np.append(True, new_keys[1:] !=
+                                                 new_keys[:-1]))[:len(units)]
+            new_last = np.append(new_first[1:], len(units))
+            found.update(zip(new_keys[new_first],
+                             zip(new_first + len(stored),
+                                 new_last + len(stored))))
+            pieces.append(units)
+
+        # Put the units of every household in order
+        bounds = np.array([found.get(house, (0, 0)) for house in house_keys],
+                          dtype=np.int64).reshape(-1, 2)
+        if len(pieces) > 1:
+            combined = pd.concat(pieces, ignore_index=True)
+        else:
+            combined = pieces[0]
+        combined = combined.take(ranges(bounds[:, 0],
+                                        bounds[:, 1] - bounds[:, 0]))
+        combined = combined.reset_index(drop=True)
+        cache.put(key, combined, replace=True)
+        return combined.drop('house', axis=1)
+
+    def process(self, cps, starts, ends):
+        """
+        Create the tax units of a block of households
+
+        Parameters
+        ----------
+        cps: CPS file sorted by household and line number
+        starts: first row of each household
+        ends: one past the last row of each household
+
+        Returns
+        -------
+        DataFrame of tax units
+        """
+        # A household never has more units than members
+        columns = UnitColumns(len(cps))
+        # Households whose units need no search are created in bulk
+        simple = self.simple_households(cps, starts, ends)
+        if simple.any():
+            columns.extend(*self.simple_units(cps, starts[simple],
+                                              ends[simple]))
+        offsets, positions = self.dependent_candidates(cps, starts, ends)
+        first = starts[0] if len(starts) else 0
+        starts = starts[~simple]
+        ends = ends[~simple]
+        # Records of the remaining households are converted at once, each
+        # household takes its own slice
+        sizes = ends - starts
+        records = cps.iloc[ranges(starts, sizes)].to_dict('records')
+        bounds = np.append(0, np.cumsum(sizes))
+        for start, end, lo, hi in tqdm(zip(starts, ends, bounds[:-1],
+                                           bounds[1:]), total=len(starts)):
             self.nunits = 0
             # Clear house_units list
             del self.house_units[:]
             # Pull households from CPS
-            household = self.cps[self.cps['h_seq'] == num]
-            household = household.sort_values('a_lineno')
-            house_dict = household.to_dict('records')
+            house_dict = records[lo:hi]
+            # Position of each line number in the household
+            self.lines = dict((person['a_lineno'], pos)
+                              for pos, person in enumerate(house_dict))
+            # Potential dependents of each member
+            self.candidates = [
+                positions[offsets[row]:offsets[row + 1]].tolist()
+                for row in range(start - first, end - first)]
 
             # Set flags for household type
             single = (house_dict[0]['h_type'] == 6 or
@@ -88,50 +830,239 @@ class Returns(object):
             # Call create for each household
             # Single persons living alone
             if single:
-                self.house_units.append(self.create(house_dict[0], house_dict))
+                self.house_units.append(self.create(house_dict, 0))
             elif group:
-                for person in house_dict:
-                    self.house_units.append(self.create(person, house_dict))
+                for pos in range(len(house_dict)):
+                    self.house_units.append(self.create(house_dict, pos))
             else:
-                for person in house_dict:
+                for pos, person in enumerate(house_dict):
                     # Only call create method if not flagged
                     if (not person['h_flag'] and not
                             person['s_flag'] and not
                             person['d_flag']):
-                        self.house_units.append(self.create(person,
-                                                            house_dict))
+                        self.house_units.append(self.create(house_dict, pos))
                     # Check if dependent needs to file
                     if not person['s_flag'] and person['d_flag']:
                         if self.must_file(person):
-                            self.house_units.append(self.create(person,
-                                                                house_dict))
+                            self.house_units.append(self.create(house_dict,
+                                                                pos))
                     # Search for dependencies within the household
                     if self.nunits > 1:
                         self.tax_units_search()
             # Check for head of household status
-            [self.hhstatus(unit) for unit in self.house_units]
+            income = sum(unit.totincx for unit in self.house_units)
+            for unit in self.house_units:
+                self.hhstatus(unit, income)
 
-            # Add each unit to full tax unit list
+            # Add each unit to the output columns
             for unit in self.house_units:
-                if not unit['t_flag']:
+                if not unit.t_flag:
                     continue
-                self.tax_units.append(self.output(unit, house_dict))
-        final_output = pd.DataFrame(self.tax_units)
-        final_output.to_csv('CPSRETS2014.csv', index=False)
-        return final_output
+                self.output(unit, house_dict, start, columns)
+        units = columns.frame(cps)
+        # Find filing status of each unit
+        self.filst(units)
+        return units
+
+    def simple_households(self, cps, starts, ends):
+        """
+        Find the households whose tax units can be created without looking
+        for spouses or dependents: single persons living alone and group
+        quarters where no two members share a family or have a spouse
 
-    def create(self, record, house):
+        Parameters
+        ----------
+        cps: CPS file sorted by household and line number
+        starts: first row of each household
+        ends: one past the last row of each household
+
+        Returns
+        -------
+        Boolean array, True for the simple households
+        """
+        if len(starts) == 0:
+            return np.zeros(0, dtype=bool)
+        sizes = ends - starts
+        h_type = cps['h_type'].values[starts]
+        spouses = np.add.reduceat(cps['a_spouse'].values != 0, starts)
+        # Group quarters members sharing a family position
+        house = np.repeat(np.arange(len(starts)), sizes)
+        ffpos = cps['ffpos'].values[starts[0]:ends[-1]]
+        order = np.lexsort((ffpos, house))
+        shared = ((house[order][1:] == house[order][:-1]) &
+                  (ffpos[order][1:] == ffpos[order][:-1]))
+        families = np.zeros(len(starts), dtype=bool)
+        families[house[order][1:][shared]] = True
+        single = ((h_type == 6) | (h_type == 7)) & (sizes == 1)
+        group = (h_type == 9) & ~families
+        return (single | group) & (spouses == 0)
+
+    def dependent_candidates(self, cps, starts, ends):
+        """
+        Evaluate the dependency tests that do not depend on the income of
+        the head for every pair of members of the same family. The income
+        share test and the flags set while units are created are checked
+        in create
+
+        Parameters
+        ----------
+        cps: CPS file sorted by household and line number
+        starts: first row of each household
+        ends: one past the last row of each household
+
+        Returns
+        -------
+        Offsets and positions in the household, such that the potential
+        dependents of the head in row i are at positions[offsets[i]:
+        offsets[i + 1]], in household order
+        """
+        first = starts[0] if len(starts) else 0
+        sizes = ends - starts
+        size = sizes.sum()
+        house = np.repeat(np.arange(len(starts)), sizes)
+        rows = np.arange(size)
+        position = rows - (starts - first)[house]
+        # Members of the same family are grouped, in household order
+        ffpos = cps['ffpos'].values[first:first + size]
+        order = np.lexsort((rows, ffpos, house))
+        new = np.ones(size, dtype=bool)
+        new[1:] = ((house[order][1:] != house[order][:-1]) |
+                   (ffpos[order][1:] != ffpos[order][:-1]))
+        family_starts = np.flatnonzero(new)
+        family_sizes = np.diff(np.append(family_starts, size))
+        # Pair every member with every member of their family
+        members = np.repeat(family_sizes, family_sizes)
+        begin = np.repeat(family_starts, family_sizes)
+        head = np.repeat(order, members)
+        offset = np.arange(members.sum()) - np.repeat(np.cumsum(members) -
+                                                      members, members)
+        candidate = order[np.repeat(begin, members) + offset]
+
+        relcode = cps['a_exprrp'].values[first:first + size]
+        generation = np.full(size, 99)
+        for code, value in GENERATIONS.items():
+            generation[relcode == code] = value
+        related = np.where((generation[head] != 99) &
+                           (generation[candidate] != 99),
+                           generation[candidate] - generation[head], 99)
+        age = cps['a_age'].values[first:first + size][candidate]
+        enrolled = cps['a_enrlw'].values[first:first + size][head] > 0
+        income = cps['income'].values[first:first + size][candidate]
+        # In general, a person's income must be less than $2,500 to be
+        # eligible to be a dependent. But there are exceptions for children
+        child = (relcode[head] == 5) | (related == -1)
+        test4 = ((income <= 2500) |
+                 (child & ((age <= 18) | ((age <= 23) & enrolled))))
+        keep = (head != candidate) & test4
+        head = head[keep]
+        candidate = candidate[keep]
+        # Sort the pairs by head, keeping the household order of the
+        # candidates
+        pairs = np.argsort(head, kind='mergesort')
+        offsets = np.searchsorted(head[pairs], np.arange(size + 1))
+        return offsets, position[candidate[pairs]]
+
+    def simple_units(self, cps, starts, ends):
+        """
+        Create the tax units of simple households, as found by
+        simple_households. Each member heads a unit of their own
+
+        Parameters
+        ----------
+        cps: CPS file sorted by household and line number
+        starts: first row of each household
+        ends: one past the last row of each household
+
+        Returns
+        -------
+        Rows of the heads in the CPS file and a dictionary holding the
+        variables of the units, as stored in UnitColumns
+        """
+        sizes = ends - starts
+        rows = ranges(starts, sizes)
+        first = rows == np.repeat(starts, sizes)
+        units = len(rows)
+
+        def var(name):
+            return cps[name].values[rows]
+
+        zeros = np.zeros(units)
+        missing = np.full(units, np.nan)
+        ageh = var('a_age')
+        ms = var('a_maritl')
+        js = np.where((ms == 1) | (ms == 2) | (ms == 3), 2, 1)
+        # Certain single individuals can file as head of household
+        js[(js == 1) & (ms == 6) & (var('h_numper') == 1) &
+           ((var('h_type') == 6) | (var('h_type') == 7))] = 3
+        self_employed = var('ljcw') == 6
+        values = {'js': js, 'ifdept': np.zeros(units, dtype=bool),
+                  'agede': ageh >= 65, 'cahe': missing, 'ageh': ageh,
+                  'ages': missing, 'was': var('wsal_val'),
+                  'intst': var('int_val'), 'dbe': var('div_val'),
+                  'alimony': var('alm_val'), 'bil': var('semp_val'),
+                  'pensions': var('rtm_val'), 'rents': var('rnt_val'),
+                  'fil': var('frse_val'), 'ucomp': var('uc_val'),
+                  'socsec': var('ss_val'),
+                  'returns': np.ones(units, dtype=bool),
+                  'wt': var('fsup_wgt'), 'zifdep': np.zeros(units, dtype=bool),
+                  'zntdep': zeros, 'zhhinc': var('hhinc'), 'zagept': ageh,
+                  'zagesp': zeros, 'zoldes': zeros, 'zyoung': zeros,
+                  'zworkc': var('wc_val'), 'zsocse': var('ss_val'),
+                  'zssinc': var('ssi_val'), 'zpubas': var('paw_val'),
+                  'zvetbe': var('vet_val'), 'zchsup': zeros, 'zfinas': zeros,
+                  'zdepin': zeros,
+                  'zowner': first & (var('h_tenure') == 1),
+                  'zwaspt': var('wsal_val'), 'zwassp': zeros,
+                  'wasp': var('wsal_val'), 'wass': zeros,
+                  'xregion': var('gereg'), 'xschb': var('int_val') > 400,
+                  'xschf': var('frse_val') != 0,
+                  'xsche': var('rnt_val') != 0,
+                  'xschc': var('semp_val') != 0, 'xhid': var('h_seq'),
+                  'xfid': var('ffpos'), 'xpid': var('ph_seq'), 'depne': zeros,
+                  'totincx': var('income'), 'xstate': var('gestfips'),
+                  'wshare': zeros, 'primary': np.where(first, 0, np.nan),
+                  'majorindustry': np.where(self_employed, var('wemind'), 0),
+                  'senonfarm': np.where(self_employed, var('semp_val'), 0),
+                  'sefarm': np.where(self_employed, var('frse_val'), 0),
+                  'oldest': zeros, 'youngest': zeros, 'xxocah': zeros,
+                  'xxoodep': zeros, 'xxopar': zeros,
+                  'xxtot': np.full(units, 2), 'depage1': missing,
+                  'depage2': missing, 'depage3': missing, 'depage4': missing,
+                  'depage5': missing}
+        return rows, values
+
+    def households(self):
+        """
+        Sort the CPS file by household and line number
+
+        Returns
+        -------
+        The sorted file and arrays with the first and one past the last row
+        of each household in self.h_nums
+        """
+        # lexsort is stable, so persons sharing a line number keep their
+        # order in the file
+        order = np.lexsort((self.cps['a_lineno'].values,
+                            self.cps['h_seq'].values))
+        cps = self.cps.iloc[order]
+        h_seq = cps['h_seq'].values
+        starts = np.searchsorted(h_seq, self.h_nums, side='left')
+        ends = np.searchsorted(h_seq, self.h_nums, side='right')
+        return cps, starts, ends
+
+    def create(self, house, position):
         """
         Create a CPS tax unit
         Parameters
         ----------
-        record: dictionary record for the head of the unit
         house: list of dictionaries, each containing a memeber of the hosuehold
+        position: position in house of the head of the unit
 
         Returns
         -------
-        A tax unit
+        TaxUnit
         """
+        record = house[position]
         # Set head of household as record
         self.nunits += 1
         # Flag head of household
@@ -185,12 +1116,6 @@ class Returns(object):
         if (self.nunits == 1) and (record['h_tenure'] == 1):
             zowner = 1
 
-        # store dependents info
-        for i in range(1, 17):
-            record['dep' + str(i)] = np.nan
-        for i in range(1, 17):
-            record['depage' + str(i)] = np.nan
-
         # marital status
         ms = record['a_maritl']
         if ms == 1 or ms == 2 or ms == 3:
@@ -198,7 +1123,6 @@ class Returns(object):
         else:
             ms_type = 1
         sp_ptr = record['a_spouse']
-        relcode = record['a_exprrp']
         # ftype = record['ftype']
         ageh = record['a_age']
         if ageh >= 65:
@@ -208,6 +1132,7 @@ class Returns(object):
         depne = 0
         ages = np.nan
         wass = 0
+        sp_pos = None
         # Single and separated individuals
         if ms_type == 1:
             js = 1
@@ -219,18 +1144,11 @@ class Returns(object):
                     js = 3
         else:
             js = 2
+            # Pull the spouse's record by line number
             if sp_ptr != 0:
-                # Pull the spouse's record
-                try:
-                    spouse = house[sp_ptr - 1]
-                # For households whose records are not in order, loop through
-                # the house to search for the spouse
-                except IndexError:
-                    for person in house:
-                        if (person['a_lineno'] == record['a_spouse'] and
-                                person['a_spouse'] == record['a_lineno']):
-                            spouse = person
-                            break
+                sp_pos = self.lines.get(sp_ptr)
+            if sp_pos is not None:
+                spouse = house[sp_pos]
                 ages = spouse['a_age']
                 if ages >= 65:
                     agede += 1
@@ -277,89 +1195,12 @@ class Returns(object):
         else:
             xschc = 0
 
-        record['101'] = record['a_age']
-        record['102'] = np.nan
-        if sp_ptr != 0:
-            record['102'] = spouse['a_age']
-        # health insurance coverage
-        record['110'] = 0
-        record['111'] = 0
-        record['112'] = 0
-        record['113'] = np.nan
-        record['114'] = np.nan
-        record['115'] = np.nan
-        if sp_ptr != 0:
-            record['113'] = 0
-            record['114'] = 0
-            record['115'] = 0
-
-        # pension coverage
-        record['116'] = 0
-        record['117'] = 0
-        record['118'] = np.nan
-        record['119'] = np.nan
-        if sp_ptr != 0:
-            record['118'] = 0
-            record['119'] = 0
-        # health status
-        record['120'] = 0
-        record['121'] = np.nan
-        if sp_ptr != 0:
-            record['121'] = 0
-
-        # miscellaneous income amounts
-        record['122'] = record['ssi_val']  # SSI
-        record['123'] = record['paw_val']  # public assistance (TANF)
-        record['124'] = record['wc_val']  # workman's compensation
-        record['125'] = record['vet_val']  # veteran's benefits
-        record['126'] = 0  # child support
-        record['127'] = record['dsab_val']  # disablility income
-        record['128'] = record['ss_val']  # social security income
-        record['129'] = zowner  # home ownership flag
-        record['130'] = 0  # wage share
-        if sp_ptr != 0:
-            record['122'] += spouse['ss_val']
-            record['123'] += spouse['paw_val']
-            record['124'] += spouse['wc_val']
-            record['125'] += spouse['vet_val']
-            record['126'] = 0
-            record['127'] += spouse['dsab_val']
-            record['128'] += spouse['ss_val']
-            totalwas = was
-            # Find total wage share
-            if totalwas > 0:
-                record['130'] = wasp / float(totalwas)
-
-        if self.nunits == 1:
-            record['131'] = 0
-            record['132'] = 0
-            record['133'] = 0
-        else:
-            record['131'] = np.nan
-            record['132'] = np.nan
-            record['133'] = np.nan
-
-        record['134'] = 0
-        record['135'] = record['ljcw']
-        record['136'] = record['wemind']
-        record['137'] = record['penatvty']
-        record['138'] = np.nan
-        record['139'] = np.nan
-        record['140'] = np.nan
-        record['141'] = np.nan
-        if sp_ptr != 0:
-            record['138'] = 0
-            record['139'] = spouse['ljcw']
-            record['140'] = spouse['wemind']
-            record['141'] = spouse['penatvty']
-
-        record['142'] = record['a_hga']  # Educational attainment
-        record['143'] = record['a_sex']  # Gender
-        record['144'] = np.nan
-        record['145'] = np.nan
-        if sp_ptr != 0:
-            record['144'] = spouse['a_hga']  # Spouse educational attainment
-            record['145'] = spouse['a_sex']  # Spouse gender
+        # Share of the unit's wages earned by the head
+        wshare = 0
+        if sp_pos is not None and was > 0:
+            wshare = wasp / float(was)
+        # Items only reported for the first unit in the household
+        primary = 0 if self.nunits == 1 else np.nan
 
         # self-employed industry - head and spouse
         classofworker = record['ljcw']
@@ -370,7 +1211,7 @@ class Returns(object):
             senonfarm = record['semp_val']
             sefarm = record['frse_val']
             majorindustry = record['wemind']
-        if sp_ptr != 0:
+        if sp_pos is not None:
             classofworker = spouse['ljcw']
             if classofworker == 6:
                 senonfarm_sp = spouse['semp_val']
@@ -380,318 +1221,35 @@ class Returns(object):
                     senonfarm += senonfarm_sp
                     sefarm += sefarm_sp
 
-        record['146'] = majorindustry
-        record['147'] = senonfarm
-        record['148'] = sefarm
-
-        record['151'] = record['a_age']
-        record['152'] = record['care']
-        record['153'] = record['caid']
-        record['154'] = record['oth']
-        record['155'] = record['hi']
-        record['156'] = record['priv']
-        record['157'] = record['paid']
-        record['158'] = record['filestat']
-        record['159'] = record['agi']
-        record['160'] = 0  # capital gains no longer on file
-        record['161'] = np.nan
-        record['162'] = np.nan
-        record['163'] = np.nan
-        record['164'] = np.nan
-        record['165'] = np.nan
-        record['166'] = np.nan
-        record['167'] = np.nan
-        record['168'] = np.nan
-        record['169'] = np.nan
-        record['170'] = np.nan
-        if sp_ptr != 0:
-            record['161'] = spouse['a_age']
-            record['162'] = spouse['care']
-            record['163'] = spouse['caid']
-            record['164'] = spouse['oth']
-            record['165'] = spouse['hi']
-            record['166'] = spouse['priv']
-            record['167'] = spouse['paid']
-            record['168'] = spouse['filestat']
-            record['169'] = spouse['agi']
-            record['170'] = 0
-
-        record['171'] = record['wsal_val']
-        record['172'] = record['int_val']
-        record['173'] = record['div_val']
-        record['174'] = record['alm_val']
-        record['175'] = record['semp_val']
-        record['176'] = record['rtm_val']
-        record['177'] = record['rnt_val']
-        record['178'] = record['frse_val']
-        record['179'] = record['uc_val']
-        record['180'] = record['ss_val']  # capital gains no longer on file
-        record['181'] = np.nan
-        record['182'] = np.nan
-        record['183'] = np.nan
-        record['184'] = np.nan
-        record['185'] = np.nan
-        record['186'] = np.nan
-        record['187'] = np.nan
-        record['188'] = np.nan
-        record['189'] = np.nan
-        record['190'] = np.nan
-        if sp_ptr != 0:
-            record['181'] = spouse['wsal_val']
-            record['182'] = spouse['int_val']
-            record['183'] = spouse['div_val']
-            record['184'] = spouse['alm_val']
-            record['185'] = spouse['semp_val']
-            record['186'] = spouse['rtm_val']
-            record['187'] = spouse['rnt_val']
-            record['188'] = spouse['frse_val']
-            record['189'] = spouse['uc_val']
-            record['190'] = spouse['ss_val']
-
-        # retirement income
-        record['191'] = record['ret_val1']
-        record['192'] = record['ret_sc1']
-        record['193'] = record['ret_val2']
-        record['194'] = record['ret_sc2']
-        record['195'] = np.nan
-        record['196'] = np.nan
-        record['197'] = np.nan
-        record['198'] = np.nan
-
-        if sp_ptr != 0:
-            record['195'] = spouse['ret_val1']
-            record['196'] = spouse['ret_sc1']
-            record['197'] = spouse['ret_val2']
-            record['198'] = spouse['ret_sc2']
-
-        # disability income
-
-        record['199'] = record['dis_val1']
-        record['200'] = record['dis_sc1']
-        record['201'] = record['dis_val2']
-        record['202'] = record['dis_sc2']
-        record['203'] = np.nan
-        record['204'] = np.nan
-        record['205'] = np.nan
-        record['206'] = np.nan
-        if sp_ptr != 0:
-            record['203'] = spouse['dis_val1']
-            record['204'] = spouse['dis_sc1']
-            record['205'] = spouse['dis_val2']
-            record['206'] = spouse['dis_sc2']
-
-        # survivor income
-
-        record['207'] = record['sur_val1']
-        record['208'] = record['sur_sc1']
-        record['209'] = record['sur_val2']
-        record['210'] = record['sur_sc2']
-        record['211'] = np.nan
-        record['212'] = np.nan
-        record['213'] = np.nan
-        record['214'] = np.nan
-
-        if sp_ptr != 0:
-            record['211'] = spouse['sur_val1']
-            record['212'] = spouse['sur_sc1']
-            record['213'] = spouse['sur_val2']
-            record['214'] = spouse['sur_sc2']
-
-        # veterans income
-
-        record['215'] = record['vet_typ1']
-        record['216'] = record['vet_typ2']
-        record['217'] = record['vet_typ3']
-        record['218'] = record['vet_typ4']
-        record['219'] = record['vet_typ5']
-        record['220'] = record['vet_val']
-        record['221'] = np.nan
-        record['222'] = np.nan
-        record['223'] = np.nan
-        record['224'] = np.nan
-        record['225'] = np.nan
-        record['226'] = np.nan
-        if sp_ptr != 0:
-            record['221'] = spouse['vet_typ1']
-            record['222'] = spouse['vet_typ2']
-            record['223'] = spouse['vet_typ3']
-            record['224'] = spouse['vet_typ4']
-            record['225'] = spouse['vet_typ5']
-            record['226'] = spouse['vet_val']
-
-        record['227'] = sp_ptr
-
-        # household
-
-        record['228'] = record['fhip_val']
-        record['229'] = record['fmoop']
-        record['230'] = record['fotc_val']
-        record['231'] = record['fmed_val']
-        record['232'] = record['hmcaid']
-        record['233'] = record['hrwicyn']
-        record['234'] = record['hfdval']
-        record['235'] = record['care_val']
-
-        # taxpayer
-        record['236'] = record['paw_val']
-        record['237'] = record['mcaid']
-        record['238'] = record['pchip']
-        record['239'] = record['wicyn']
-        record['240'] = record['ssi_val']
-        record['241'] = record['hi_yn']
-        record['242'] = record['hiown']
-        record['243'] = record['hiemp']
-        record['244'] = record['hipaid']
-        record['245'] = record['emcontrb']
-        record['246'] = record['hi']
-        record['247'] = record['hityp']
-        record['248'] = record['paid']
-        record['249'] = record['priv']
-        record['250'] = record['prityp']
-        record['251'] = record['ss_val']
-        record['252'] = record['uc_val']
-        record['253'] = record['mcare']
-        record['254'] = record['wc_val']
-        record['255'] = record['vet_val']
-        record['256'] = np.nan
-        record['257'] = np.nan
-        record['258'] = np.nan
-        record['259'] = np.nan
-        record['260'] = np.nan
-        record['261'] = np.nan
-        record['262'] = np.nan
-        record['263'] = np.nan
-        record['264'] = np.nan
-        record['265'] = np.nan
-        record['266'] = np.nan
-        record['267'] = np.nan
-        record['268'] = np.nan
-        record['269'] = np.nan
-        record['270'] = np.nan
-        record['271'] = np.nan
-        record['272'] = np.nan
-        record['273'] = np.nan
-        record['274'] = np.nan
-        record['275'] = np.nan
-
-        if sp_ptr != 0:
-            record['256'] = spouse['paw_val']
-            record['257'] = spouse['mcaid']
-            record['258'] = spouse['pchip']
-            record['259'] = spouse['wicyn']
-            record['260'] = spouse['ssi_val']
-            record['261'] = spouse['hi_yn']
-            record['262'] = spouse['hiown']
-            record['263'] = spouse['hiemp']
-            record['264'] = spouse['hipaid']
-            record['265'] = spouse['emcontrb']
-            record['266'] = spouse['hi']
-            record['267'] = spouse['hityp']
-            record['268'] = spouse['paid']
-            record['269'] = spouse['priv']
-            record['270'] = spouse['prityp']
-            record['271'] = spouse['ss_val']
-            record['272'] = spouse['uc_val']
-            record['273'] = spouse['mcare']
-            record['274'] = spouse['wc_val']
-            record['275'] = spouse['vet_val']
-
-        totincx = (was + intst + dbe + alimony + bil + pensions + rents + fil +
-                   ucomp + socsec)
+        totincx = record['income']
+        if sp_pos is not None:
+            totincx += spouse['income']
 
+        unit = TaxUnit(record, position, sp_pos)
         if not ifdept:
             # Search for dependents among other members of the household who
             # are not already claimed on another return.
-            for individual in house:
-                idxfid = individual['ffpos']
-                idxhea = individual['h_flag']
-                idxspo = individual['s_flag']
-                idxdep = individual['d_flag']
-                dflag = False
-                if ((house.index(individual) != house.index(record)) and
-                        idxfid == xfid and not idxdep and not idxspo and
-                        not idxhea):
-                    # Determine if Individual is a dependent of the reference
-                    # person
-                    test1 = 1
-                    test2 = 1
-                    test3 = 1
-                    test4 = 0
-                    test5 = 0
-                    dflag = False
-                    age = individual['a_age']
-                    income = (individual['wsal_val'] + individual['semp_val'] +
-                              individual['frse_val'] + individual['uc_val'] +
-                              individual['ss_val'] + individual['rtm_val'] +
-                              individual['int_val'] + individual['div_val'] +
-                              individual['rnt_val'] + individual['alm_val'])
-                    # set up child flag (related == -1)
-                    reference_person = record['a_exprrp']
-                    index_person = individual['a_exprrp']
-                    if reference_person == 5:
-                        genref = -1
-                    elif reference_person == 7:
-                        genref = -2
-                    elif reference_person == 8:
-                        genref = 1
-                    elif reference_person == 9:
-                        genref = 0
-                    elif reference_person == 11:
-                        genref = -1
-                    else:
-                        genref = 99
-                    if index_person == 5:
-                        genind = -1
-                    elif index_person == 7:
-                        genind = -2
-                    elif index_person == 8:
-                        genind = 1
-                    elif index_person == 9:
-                        genind = 0
-                    elif index_person == 11:
-                        genind = -1
-                    else:
-                        genind = 99
-                    if genref != 99 and genind != 99:
-                        related = genind - genref
-                    else:
-                        related = 99
-                    # In general, a person's income must be less than $2,500 to
-                    # be eligible to be a dependent.
-                    # But there are exceptions for children.
-                    if income <= 2500:
-                        test4 = 1
-                    if (relcode == 5) or (related == -1):
-                        if age <= 18 or (age <= 23 and record['a_enrlw'] > 0):
-                            test4 = 1
-                    if totincx + income > 0:
-                        if income / float(totincx + income) < 0.5:
-                            test5 = 1
-                    else:
-                        test5 = 1
-                    dtest = test1 + test2 + test3 + test4 + test5
-                    if dtest == 5:
-                        dflag = True
+            for pos in self.candidates[position]:
+                individual = house[pos]
+                if (individual['h_flag'] or individual['s_flag'] or
+                        individual['d_flag']):
+                    continue
+                # Tests that do not depend on the head's income were done
+                # by dependent_candidates
+                income = individual['income']
+                dflag = True
+                if totincx + income > 0:
+                    if income / float(totincx + income) >= 0.5:
+                        dflag = False
                 if dflag:
                     individual['d_flag'] = True
                     depne += 1
-                    dage = individual['a_age']
-                    record[('dep' + str(depne))] = house.index(individual)
-                    record['depage' + str(depne)] = dage
+                    unit.deps.append(pos)
+                    unit.depages.append(individual['a_age'])
 
         cahe = np.nan
 
-        record['t_flag'] = True  # tax unit flag
-        returns = record['t_flag']
-
-        namelist = ['js', 'ifdept', 'agede', 'cahe', 'ageh', 'ages', 'was',
-                    'intst', 'dbe', 'alimony', 'bil', 'pensions', 'rents',
-                    'fil', 'ucomp', 'socsec', 'returns', 'wt', 'zifdep',
-                    'zntdep', 'zhhinc', 'zagept', 'zagesp', 'zoldes', 'zyoung',
-                    'zworkc', 'zsocse', 'zssinc', 'zpubas', 'zvetbe', 'zchsup',
-                    'zfinas', 'zdepin', 'zowner', 'zwaspt', 'zwassp', 'wasp',
-                    'wass', 'xregion', 'xschb', 'xschf', 'xsche', 'xschc',
-                    'xhid', 'xfid', 'xpid', 'depne', 'totincx', 'xstate']
+        returns = unit.t_flag
 
         varlist = [js, ifdept, agede, cahe, ageh, ages, was, intst, dbe,
                    alimony, bil, pensions, rents, fil, ucomp, socsec, returns,
@@ -699,41 +1257,30 @@ class Returns(object):
                    zworkc, zsocse, zssinc, zpubas, zvetbe, zchsup, zfinas,
                    zdepin, zowner, zwaspt, zwassp, wasp, wass, xregion, xschb,
                    xschf, xsche, xschc, xhid, xfid, xpid, depne, totincx,
-                   xstate]
+                   xstate, wshare, primary, majorindustry, senonfarm, sefarm]
 
-        for name, var in zip(namelist, varlist):
-            record[name] = var
-        return record
+        for name, var in zip(TaxUnit.variables, varlist):
+            setattr(unit, name, var)
+        return unit
 
-    def hhstatus(self, unit):
+    def hhstatus(self, unit, income):
         """
         Determine head of household status
 
         Parameters
         ----------
         unit: a tax unit
+        income: total income of the tax units in the household
         """
-
-        income = 0
-        # Find total income for the tax unit
-        for iunit in self.house_units:
-            totinc = (iunit['was'] + iunit['intst'] + iunit['dbe'] +
-                      iunit['alimony'] + iunit['bil'] + iunit['pensions'] +
-                      iunit['rents'] + iunit['fil'] + iunit['ucomp'] +
-                      iunit['socsec'])
-            income += totinc
         # Find income for the individual
         if income > 0:
-            totincx = (unit['was'] + unit['intst'] + unit['dbe'] +
-                       unit['alimony'] + unit['bil'] + unit['pensions'] +
-                       unit['rents'] + unit['fil'] + unit['ucomp'] +
-                       unit['socsec'])
-            indjs = unit['js']  # Filind status
-            indif = unit['ifdept']  # Dependency status
-            inddx = unit['depne']  # Number of dependent exemptions
+            totincx = unit.totincx
+            indjs = unit.js  # Filind status
+            indif = unit.ifdept  # Dependency status
+            inddx = unit.depne  # Number of dependent exemptions
             if indjs == 1 and float(totincx) / income > 0.99:
                 if indif != 1 and inddx > 0:
-                    unit['js'] = 3
+                    unit.js = 3
 
     def must_file(self, record):
         """
@@ -746,10 +1293,7 @@ class Returns(object):
         True if person must file, False otherwise
         """
         wages = record['wsal_val']
-        income = (wages + record['semp_val'] + record['frse_val'] +
-                  record['uc_val'] + record['ss_val'] + record['rtm_val'] +
-                  record['int_val'] + record['div_val'] + record['rnt_val'] +
-                  record['alm_val'])
+        income = record['income']
         # Determine if dependent exceeds filing thresholds
         if wages > self.depwages or income > self.depTotal:
             depfile = True
@@ -770,41 +1314,27 @@ class Returns(object):
         -------
         None
         """
-        self.house_units[ix]['ifdept'] = True
-        ixdeps = self.house_units[ix]['depne']
-        iydeps = self.house_units[iy]['depne']
-        self.house_units[ix]['depne'] = 0
-        ixjs = self.house_units[ix]['js']
-        if ixjs == 2:
-            self.house_units[iy]['depne'] += ixdeps + 2
-            self.house_units[iy]['dep' + str(iydeps + 1)] = ix
-            self.house_units[iy][('dep' +
-                                  str(iydeps +
-                                      2))] = self.house_units[ix]['sp_ptr']
-            self.house_units[iy][('depage' +
-                                  str(iydeps +
-                                      1))] = self.house_units[ix]['a_age']
-            self.house_units[iy][('depage' +
-                                  str(iydeps +
-                                      2))] = self.house_units[ix]['ages']
-            iybgin = iydeps + 2
+        source = self.house_units[ix]
+        target = self.house_units[iy]
+        source.ifdept = True
+        ixdeps = source.depne
+        source.depne = 0
+        # The head, and spouse if any, of the source become dependents
+        if source.spouse is not None:
+            target.depne += ixdeps + 2
+            target.deps.append(source.position)
+            target.deps.append(source.spouse)
+            target.depages.append(source.ageh)
+            target.depages.append(source.ages)
         else:
-            self.house_units[iy]['depne'] += (ixdeps + 1)
-            self.house_units[iy]['dep' + str(iydeps + 1)] = ix
-            self.house_units[iy][('depage' +
-                                  str(iydeps +
-                                      1))] = self.house_units[ix]['a_age']
-            iybgin = iydeps + 1
-        if ixdeps > 0:
-            # Assign any dependents to target record
-            for ndeps in range(1, ixdeps + 1):
-                dep = 'dep' + str(iybgin + ndeps)
-                depx = 'dep' + str(ndeps)
-                depage = 'depage' + str(iybgin + ndeps)
-                depagex = 'depage' + str(ndeps)
-                self.house_units[iy][dep] = self.house_units[ix][depx]
-                self.house_units[ix][dep] = 0
-                self.house_units[iy][depage] = self.house_units[ix][depagex]
+            target.depne += ixdeps + 1
+            target.deps.append(source.position)
+            target.depages.append(source.ageh)
+        # Assign any dependents to target record
+        target.deps.extend(source.deps)
+        target.depages.extend(source.depages)
+        del source.deps[:]
+        del source.depages[:]
 
     def tax_units_search(self):
         """
@@ -814,106 +1344,57 @@ class Returns(object):
         idxhigh = 0
         # Find tax unit with highest income
         for ix in range(0, self.nunits):
-            totincx = self.house_units[ix]['totincx']
+            totincx = self.house_units[ix].totincx
             if totincx > highest:
                 highest = totincx
                 idxhigh = ix
         # If it is not already a dependent unit, search for dependents
-        if not self.house_units[idxhigh]['ifdept']:
+        if not self.house_units[idxhigh].ifdept:
             for ix in range(0, self.nunits):
-                idxjs = self.house_units[ix]['js']
-                idxdepf = self.house_units[ix]['ifdept']
-                idxrelc = self.house_units[ix]['a_exprrp']
-                idxfamt = self.house_units[ix]['ftype']
+                idxjs = self.house_units[ix].js
+                idxdepf = self.house_units[ix].ifdept
+                idxrelc = self.house_units[ix].head['a_exprrp']
+                idxfamt = self.house_units[ix].head['ftype']
                 if (ix != idxhigh and not idxdepf and highest > 0 and
                         idxjs != 2):
                     if idxfamt == 1 or idxfamt == 3 or idxfamt == 5:
-                        totincx = self.house_units[ix]['totincx']
+                        totincx = self.house_units[ix].totincx
                         if totincx <= 0:
-                            self.house_units[ix]['t_flag'] = False
+                            self.house_units[ix].t_flag = False
                             self.convert(ix, idxhigh)
                         if 0 < totincx <= 3000:
                             self.convert(ix, idxhigh)
                     if idxrelc == 11:
-                        self.house_units[ix]['t_flag'] = False
+                        self.house_units[ix].t_flag = False
                         self.convert(ix, idxhigh)
 
-    def filst(self, unit):
+    def filst(self, units):
         """
-        Determines whether or not a tax unit files a return using five tests
-        1. Wage test. If anyone in the tax unit had wage and salary income,
-           the unit is deemed to file a return
-        2. Gross income test. The income thresholds in the 1040 filing
-           requirements are used to determine if the tax unit has to file.
-        3. Dependent filer test. Individuals who are claimed as dependents, but
-           are required to file a return
-        4. Random selection
-        5. Negative income
+        Determine whether or not each tax unit files a return, using the
+        thresholds of this object
 
         Parameters
         ----------
-        unit: a tax unit
+        units: DataFrame of tax units. The result is stored in its filst
+               column
         """
-        # Wage test
-        unit['filst'] = 0
-        if unit['js'] == 1:
-            if unit['was'] >= self.wage1:
-                unit['filst'] = 1
-        elif unit['js'] == 2:
-            if unit['depne'] > 0:
-                if unit['was'] >= self.wage2:
-                    unit['filst'] = 1
-                if unit['was'] >= self.wage2nk:
-                    unit['filst'] = 1
-
-        # Gross income test
-        if unit['js'] == 1:
-            amount = self.single - self.depExempt * unit['depne']
-            if unit['agede'] != 0:
-                amount = self.single65 - self.depExempt * unit['depne']
-            if unit['income'] >= amount:
-                unit['filst'] = 1
-        if unit['js'] == 2:
-            amount = self.joint - self.depExempt * unit['depne']
-            if unit['agede'] == 1:
-                amount = self.joint65one - self.depExempt * unit['depne']
-                amount = self.joint65both - self.depExempt * unit['depne']
-            if unit['income'] >= amount:
-                unit['filst'] = 1
-        if unit['js'] == 3:
-            amount = self.hoh
-            if unit['agede'] != 0:
-                amount = self.hoh65 - self.depExempt * unit['depne']
-            if unit['income'] >= amount:
-                unit['filst'] = 1
-
-        # Dependent filer test
-        if unit['ifdept']:
-            unit['filst'] = 1
-        # Random selection
-        if (unit['js'] == 3 and unit['agede'] > 0 and
-                unit['income'] < 6500 and unit['depne'] > 0):
-            unit['filst'] = 0
-        # Negative incomet test
-        if unit['bil'] < 0 or unit['fil'] < 0 or unit['rents'] < 0:
-            unit['filst'] = 1
-
-    def output(self, unit, house):
+        scenario = pd.DataFrame([dict((name, getattr(self, name))
+                                      for name in FILING_THRESHOLDS)])
+        status = filing_status(units, scenario)
+        units['filst'] = status.values[:, 0].astype(np.int64)
+
+    def output(self, unit, house, start, columns):
         """
         After the tax units have been created, output all records
         Parameters
         ----------
-        unit: head tax unit
+        unit: TaxUnit
         house: household of tax unit
-
-        Returns
-        -------
-        Completed tax unit
+        start: row of the first member of the household in the CPS file
+        columns: UnitColumns the unit is written to
         """
-
-        record = {}
-        depne = unit['depne']
-        if unit['js'] == 2:
+        depne = unit.depne
+        if unit.js == 2:
             txpye = 2
         else:
             txpye = 2
@@ -922,273 +1403,45 @@ class Returns(object):
         xxoodep = 0
         xxopar = 0
         xxocah = 0
-        xxocawh = 0
-        if depne > 0:
-            for i in range(1, depne + 1):
-                dindex = unit['dep' + str(i)]
-                drel = house[dindex]['a_exprrp']
-                dage = house[dindex]['a_age']
-                if drel == 8:
-                    xxopar += 1
-                if drel >= 9 and dage >= 18:
-                    xxoodep += 1
-                if dage < 18:
-                    xxocah += 1
-
-        record['xagex'] = unit['agede']
-        record['hhid'] = unit['h_seq']
+        for dindex in unit.deps:
+            drel = house[dindex]['a_exprrp']
+            dage = house[dindex]['a_age']
+            if drel == 8:
+                xxopar += 1
+            if drel >= 9 and dage >= 18:
+                xxoodep += 1
+            if dage < 18:
+                xxocah += 1
 
         oldest = 0
         youngest = 0
         if depne > 0:
             oldest = -9.9e16
             youngest = 9.9e16
-            for i in range(1, depne + 1):
-                dage = unit['depage' + str(i)]
+            for dage in unit.depages:
                 if dage > oldest:
                     oldest = dage
                 if dage < youngest:
                     youngest = dage
-                unit['zoldes'] = oldest
-                unit['zyoung'] = youngest
-        record['oldest'] = oldest
-        record['youngest'] = youngest
-        record['xxocah'] = xxocah
-        record['xxpcawh'] = xxocawh
-        record['xxoodep'] = xxoodep
-        record['xxopar'] = xxopar
-        record['xxtot'] = xxtot
-
-        repeated_vars = ['xstate', 'xregion', 'xschb', 'xschf',
-                         'xsche', 'xschc', 'xhid', 'xfid', 'xpid', 'h_seq',
-                         'peridnum', 'js', 'ifdept', 'agede', 'depne', 'cahe',
-                         'ageh', 'ages', 'was', 'intst', 'dbe', 'alimony',
-                         'bil', 'pensions', 'rents', 'fil', 'ucomp', 'socsec',
-                         'returns', 'wt', 'zifdep', 'zntdep', 'zhhinc',
-                         'zagesp', 'zoldes', 'zyoung', 'zworkc', 'zsocse',
-                         'zssinc', 'zpubas', 'zvetbe', 'zfinas', 'zowner',
-                         'zwaspt', 'zwassp', 'wasp', 'wass']
-        for var in repeated_vars:
-            record[var] = unit[var]
-
-        icps1 = unit['101']
-        icps2 = unit['102']
-        icps3 = np.nan
-        icps4 = np.nan
-        icps5 = np.nan
-        icps6 = np.nan
-        icps7 = np.nan
-        icps8 = youngest
-        icps9 = oldest
-        icps10 = unit['110']
-        icps11 = unit['111']
-        icps12 = unit['112']
-        icps13 = unit['113']
-        icps14 = unit['114']
-        icps15 = unit['115']
-        icps16 = unit['116']
-        icps17 = unit['117']
-        icps18 = unit['118']
-        icps19 = unit['119']
-        icps20 = unit['120']
-        icps21 = unit['121']
-        icps22 = unit['122']
-        icps23 = unit['123']
-        icps24 = unit['124']
-        icps25 = unit['125']
-        icps26 = unit['126']
-        icps27 = unit['127']
-        icps28 = unit['128']
-        icps29 = unit['129']
-        icps30 = unit['130']
-        icps31 = unit['131']
-        icps32 = unit['132']
-        icps33 = unit['133']
-        icps34 = unit['134']
-        icps35 = unit['135']
-        icps36 = unit['136']
-        icps37 = unit['137']
-        icps38 = unit['138']
-        icps39 = unit['139']
-        icps40 = unit['140']
-        icps41 = unit['141']
-        icps42 = unit['142']
-        icps43 = unit['143']
-        icps44 = unit['144']
-        icps45 = unit['145']
-        icps46 = unit['146']
-        icps47 = unit['147']
-        icps48 = unit['148']
-
-        jcps1 = unit['151']
-        jcps2 = unit['152']
-        jcps3 = unit['153']
-        jcps4 = unit['154']
-        jcps5 = unit['155']
-        jcps6 = unit['156']
-        jcps7 = unit['157']
-        jcps8 = unit['158']
-        jcps9 = unit['159']
-        jcps10 = unit['160']
-        jcps11 = unit['161']
-        jcps12 = unit['162']
-        jcps13 = unit['163']
-        jcps14 = unit['164']
-        jcps15 = unit['165']
-        jcps16 = unit['166']
-        jcps17 = unit['167']
-        jcps18 = unit['168']
-        jcps19 = unit['169']
-        jcps20 = unit['170']
-        jcps21 = unit['171']
-        jcps22 = unit['172']
-        jcps23 = unit['173']
-        jcps24 = unit['174']
-        jcps25 = unit['175']
-        jcps26 = unit['176']
-        jcps27 = unit['177']
-        jcps28 = unit['178']
-        jcps29 = unit['179']
-        jcps30 = unit['180']
-        jcps31 = unit['181']
-        jcps32 = unit['182']
-        jcps33 = unit['183']
-        jcps34 = unit['184']
-        jcps35 = unit['185']
-        jcps36 = unit['186']
-        jcps37 = unit['187']
-        jcps38 = unit['188']
-        jcps39 = unit['189']
-        jcps40 = unit['190']
-        jcps41 = unit['191']
-        jcps42 = unit['192']
-        jcps43 = unit['193']
-        jcps44 = unit['194']
-        jcps45 = unit['195']
-        jcps46 = unit['196']
-        jcps47 = unit['197']
-        jcps48 = unit['198']
-        jcps49 = unit['199']
-        jcps50 = unit['200']
-        jcps51 = unit['201']
-        jcps52 = unit['202']
-        jcps53 = unit['203']
-        jcps54 = unit['204']
-        jcps55 = unit['205']
-        jcps56 = unit['206']
-        jcps57 = unit['207']
-        jcps58 = unit['208']
-        jcps59 = unit['209']
-        jcps60 = unit['210']
-        jcps61 = unit['211']
-        jcps62 = unit['212']
-        jcps63 = unit['213']
-        jcps64 = unit['214']
-        jcps65 = unit['215']
-        jcps66 = unit['216']
-        jcps67 = unit['217']
-        jcps68 = unit['218']
-        jcps69 = unit['219']
-        jcps70 = unit['220']
-        jcps71 = unit['221']
-        jcps72 = unit['222']
-        jcps73 = unit['223']
-        jcps74 = unit['224']
-        jcps75 = unit['225']
-        jcps76 = unit['226']
-        jcps77 = np.nan
-        jcps78 = np.nan
-        jcps79 = np.nan
-        jcps80 = np.nan
-        jcps81 = np.nan
-        jcps82 = np.nan
-        jcps83 = np.nan
-        jcps84 = np.nan
-
-        if not unit['ifdept']:
-            jcps77 = unit['228']
-            jcps78 = unit['229']
-            jcps79 = unit['230']
-            jcps80 = unit['231']
-            jcps81 = unit['232']
-            jcps82 = unit['233']
-            jcps83 = unit['234']
-            jcps84 = unit['235']
-
-        jcps85 = unit['236']
-        jcps86 = unit['237']
-        jcps87 = unit['238']
-        jcps88 = unit['239']
-        jcps89 = unit['240']
-        jcps90 = unit['241']
-        jcps91 = unit['242']
-        jcps92 = unit['243']
-        jcps93 = unit['244']
-        jcps94 = unit['245']
-        jcps95 = unit['246']
-        jcps96 = unit['247']
-        jcps97 = unit['248']
-        jcps98 = unit['249']
-        jcps99 = unit['250']
-        jcps100 = unit['251']
-        jcps101 = unit['252']
-        jcps102 = unit['253']
-        jcps103 = unit['254']
-        jcps104 = unit['255']
-        jcps105 = unit['256']
-        jcps106 = unit['257']
-        jcps107 = unit['258']
-        jcps108 = unit['259']
-        jcps109 = unit['260']
-        jcps110 = unit['261']
-        jcps111 = unit['262']
-        jcps112 = unit['263']
-        jcps113 = unit['264']
-        jcps114 = unit['265']
-        jcps115 = unit['266']
-        jcps116 = unit['267']
-        jcps117 = unit['268']
-        jcps118 = unit['269']
-        jcps119 = unit['270']
-        jcps120 = unit['271']
-        jcps121 = unit['272']
-        jcps122 = unit['273']
-        jcps123 = unit['274']
-        jcps124 = unit['275']
-
-        for i in range(1, 49):
-            var = 'icps' + str(i)
-            record[str(var)] = eval(var)
-        for i in range(1, 125):
-            var = 'jcps' + str(i)
-            record[str(var)] = eval(var)
-
-        d5 = min(depne, 5)
-        if d5 > 0:
-            for i in range(1, d5 + 1):
-                var = 'icps' + str(2+i)
-                record[str(var)] = unit['depage' + str(i)]
+                unit.zoldes = oldest
+                unit.zyoung = youngest
 
         zdepin = 0
-        if depne > 0:
-            for i in range(1, depne + 1):
-                dindex = unit['dep' + str(i)]
-                if not house[dindex]['flag']:
-                    zdepin += (house[dindex]['wsal_val'] +
-                               house[dindex]['semp_val'] +
-                               house[dindex]['frse_val'] +
-                               house[dindex]['uc_val'] +
-                               house[dindex]['ss_val'] +
-                               house[dindex]['rtm_val'] +
-                               house[dindex]['int_val'] +
-                               house[dindex]['div_val'] +
-                               house[dindex]['alm_val'])
-        record['zdepin'] = zdepin
-        record['income'] = (unit['was'] + unit['intst'] + unit['dbe'] +
-                            unit['alimony'] + unit['bil'] + unit['pensions'] +
-                            unit['rents'] + unit['fil'] + unit['ucomp'] +
-                            unit['socsec'])
-        # Find filing status of record
-        self.filst(record)
-
-        return record
+        for dindex in unit.deps:
+            # Rents are not counted in dependent income
+            if not house[dindex]['flag']:
+                zdepin += house[dindex]['income'] - house[dindex]['rnt_val']
+        unit.zdepin = zdepin
+
+        row = columns.add(unit, start)
+        values = columns.values
+        values['oldest'][row] = oldest
+        values['youngest'][row] = youngest
+        values['xxocah'][row] = xxocah
+        values['xxoodep'][row] = xxoodep
+        values['xxopar'][row] = xxopar
+        values['xxtot'][row] = xxtot
+        # Ages of the first five dependents
+        for i in range(5):
+            dage = unit.depages[i] if i < depne else np.nan
+            values['depage' + str(i + 1)][row] = dage
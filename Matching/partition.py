@@ -0,0 +1,133 @@
+"""
+Partitions of a table that share the rows of the table instead of copying
+them. Columns are only copied when they are read, and only for the rows of
+the partition.
+"""
+import numpy as np
+
+
+def partition(table, mask):
+    """
+    Split a table in two
+
+    Parameters
+    ----------
+    table: DataFrame
+    mask: boolean array selecting the rows of the first partition
+
+    Returns
+    -------
+    PartitionViews of the rows where mask is True and where it is False
+    """
+    mask = np.asarray(mask, dtype=bool)
+    return (PartitionView(table, np.flatnonzero(mask)),
+            PartitionView(table, np.flatnonzero(~mask)))
+
+
+class PartitionView(object):
+    """
+    Rows of a table, read through the DataFrame methods used by the
+    matching stages. The table itself is shared by all its partitions
+    """
+    def __init__(self, table, rows):
+        """
+        Parameters
+        ----------
+        table: DataFrame holding the rows
+        rows: positions of the rows of the partition in table
+        """
+        self.table = table
+        self.rows = np.asarray(rows, dtype=np.intp)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getattr__(self, name):
+        # Columns can be read as attributes, like a DataFrame
+        if name not in ('table', 'rows') and name in self.table.columns:
+            return self[name]
+        raise AttributeError(name)
+
+    def __getitem__(self, key):
+        """
+        A column as a Series, a list of columns as a DataFrame, or the rows
+        selected by a boolean array as another PartitionView
+        """
+        if isinstance(key, str):
+            return self.table[key].take(self.rows)
+        if isinstance(key, list):
+            columns = self.table.columns.get_indexer(key)
+            if (columns < 0).any():
+                missing = [name for name, col in zip(key, columns)
+                           if col < 0]
+                raise KeyError(missing)
+            return self.table.iloc[self.rows, columns]
+        mask = np.asarray(key, dtype=bool)
+        if len(mask) != len(self.rows):
+            raise ValueError('Mask has {} rows, the partition {}'.format(
+                len(mask), len(self.rows)))
+        return PartitionView(self.table, self.rows[mask])
+
+    @property
+    def columns(self):
+        return self.table.columns
+
+    @property
+    def index(self):
+        return self.table.index[self.rows]
+
+    @property
+    def shape(self):
+        return (len(self.rows), len(self.table.columns))
+
+    def filter(self, items=None, like=None, regex=None):
+        """
+        Columns selected as in DataFrame.filter
+
+        Returns
+        -------
+        DataFrame holding the selected columns of the partition
+        """
+        names = self.table.iloc[:0].filter(items=items, like=like,
+                                           regex=regex).columns
+        return self[list(names)]
+
+    def head(self, n=5):
+        """
+        First n rows as a DataFrame
+        """
+        return self.table.iloc[self.rows[:n]]
+
+    def to_frame(self, columns=None):
+        """
+        Copy the partition into a DataFrame
+
+        Parameters
+        ----------
+        columns: columns to copy. All columns when None
+
+        Returns
+        -------
+        DataFrame
+        """
+        if columns is None:
+            return self.table.iloc[self.rows]
+        return self[list(columns)]
+
+    def to_csv(self, path, chunksize=100000, **kwargs):
+        """
+        Write the partition to a CSV file a block of rows at a time, so it
+        is never copied whole
+
+        Parameters
+        ----------
+        path: file to write
+        chunksize: number of rows copied at a time
+        kwargs: options of DataFrame.to_csv
+        """
+        kwargs.pop('mode', None)
+        kwargs.pop('header', None)
+        for lo in range(0, max(len(self.rows), 1), chunksize):
+            block = self.table.iloc[self.rows[lo:lo + chunksize]]
+            block.to_csv(path, mode='w' if lo == 0 else 'a',
+                         header=lo == 0, **kwargs)
@@ -7,6 +7,11 @@ import numpy as np
 import pandas as pd
 import statsmodels.api as sm
 
+# Variables of the CPS tax units read by phaseone
+CPS_COLUMNS = ['cpsseq', 'wt', 'js', 'depne', 'ifdept', 'agede', 'was',
+               'intst', 'dbe', 'alimony', 'bil', 'pensions', 'rents', 'fil',
+               'ucomp', 'socsec']
+
 
 def partitioning(was, intst, bil, fil, js, depne, ifdept, agede, texint, dbe,
                  sche, ssinc, pensions, alimony, ucagix):
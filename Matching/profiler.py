@@ -0,0 +1,143 @@
+"""
+Timing of the stages used to create tax units
+The timed methods are only replaced on the object being profiled, so a
+Returns object that is not profiled runs exactly the same code as before.
+"""
+from collections import OrderedDict
+import json
+from timeit import default_timer
+
+
+# Stages timed for each household, and stages run once per block of
+# households
+HOUSEHOLD_STAGES = ('create', 'must_file', 'tax_units_search', 'convert',
+                    'hhstatus', 'output')
+BLOCK_STAGES = ('simple_units', 'filst')
+
+
+def household_type(h_type):
+    """
+    Household type used to group the timings
+
+    Parameters
+    ----------
+    h_type: CPS household type
+
+    Returns
+    -------
+    'single', 'group' or 'other'
+    """
+    if h_type == 6 or h_type == 7:
+        return 'single'
+    if h_type == 9:
+        return 'group'
+    return 'other'
+
+
+class StageProfiler(object):
+    """
+    Cumulative time and number of calls of each stage, by household type
+    and household size. The time of a stage includes the stages it calls,
+    so tax_units_search includes convert
+    """
+    def __init__(self):
+        # (stage, household type, household size) -> [calls, seconds]
+        self.stats = dict()
+        # Household currently processed
+        self.household = ('block', 0)
+
+    def attach(self, returns):
+        """
+        Time the stages of a Returns object
+
+        Parameters
+        ----------
+        returns: Returns object to profile
+        """
+        for stage in HOUSEHOLD_STAGES + BLOCK_STAGES:
+            setattr(returns, stage,
+                    self.timed(stage, getattr(returns, stage)))
+        returns.profiler = self
+
+    def detach(self, returns):
+        """
+        Restore the stages of a Returns object
+        """
+        for stage in HOUSEHOLD_STAGES + BLOCK_STAGES:
+            returns.__dict__.pop(stage, None)
+        returns.profiler = None
+
+    def timed(self, stage, method):
+        """
+        Wrap a method so its calls are counted and timed
+        """
+        stats = self.stats
+        block = stage in BLOCK_STAGES
+
+        def wrapper(*args):
+            if stage == 'create':
+                # Every other household stage follows a call to create
+                house = args[0]
+                self.household = (household_type(house[0]['h_type']),
+                                  len(house))
+            key = (stage,) + (('block', 0) if block else self.household)
+            begin = default_timer()
+            result = method(*args)
+            elapsed = default_timer() - begin
+            entry = stats.get(key)
+            if entry is None:
+                stats[key] = [1, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+            return result
+        return wrapper
+
+    def merge(self, other):
+        """
+        Add the timings of another profiler, such as one used by a worker
+        """
+        for key, (calls, seconds) in other.stats.items():
+            entry = self.stats.setdefault(key, [0, 0.])
+            entry[0] += calls
+            entry[1] += seconds
+
+    def totals(self):
+        """
+        Calls and time of each stage over all households
+
+        Returns
+        -------
+        OrderedDict of stage -> {'calls': calls, 'seconds': seconds}
+        """
+        totals = OrderedDict()
+        for stage in HOUSEHOLD_STAGES + BLOCK_STAGES:
+            totals[stage] = {'calls': 0, 'seconds': 0.}
+        for (stage, _, _), (calls, seconds) in self.stats.items():
+            totals[stage]['calls'] += calls
+            totals[stage]['seconds'] += seconds
+        return totals
+
+    def to_dict(self):
+        """
+        Timings as a dictionary holding the totals of each stage and one
+        record per stage, household type and size
+        """
+        records = [{'stage': stage, 'household': kind, 'size': size,
+                    'calls': calls, 'seconds': seconds}
+                   for (stage, kind, size), (calls, seconds)
+                   in sorted(self.stats.items())]
+        return {'totals': self.totals(), 'records': records}
+
+    def to_json(self, path=None):
+        """
+        Export the timings as JSON
+
+        Parameters
+        ----------
+        path: file to write. The JSON text is returned when None
+        """
+        if path is None:
+            return json.dumps(self.to_dict(), indent=2)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
@@ -0,0 +1,146 @@
+"""
+Read the SOI Public Use File
+Input file: puf2009.csv
+"""
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from cache import ParseCache, file_digest
+
+# Part of the key of cached tables. Change it whenever a change to the
+# loader alters its output, so tables loaded by older versions are ignored.
+LOADER_VERSION = 1
+# Record id of the aggregate records, which are not returns
+AGGREGATE = 999999
+
+# Types of the codes and counts in the file. Other variables are dollar
+# amounts, stored as int32 when they are whole numbers small enough that a
+# sum of MAX_TERMS of them cannot overflow, and left as read otherwise.
+PUF_DTYPES = {
+    'recid': np.int32, 's006': np.int32, 's008': np.int32,
+    's009': np.int32, 'flpdyr': np.int16, 'mars': np.int8, 'dsi': np.int8,
+    'eic': np.int8, 'elect': np.int8, 'fded': np.int8, 'flpdmo': np.int8,
+    'f2441': np.int8, 'f3800': np.int8, 'f6251': np.int8, 'f8582': np.int8,
+    'f8606': np.int8, 'f8829': np.int8, 'f8910': np.int8, 'ie': np.int8,
+    'midr': np.int8, 'n20': np.int8, 'n24': np.int8, 'n25': np.int8,
+    'n30': np.int8, 'prep': np.int8, 'schb': np.int8, 'schcf': np.int8,
+    'sche': np.int8, 'tform': np.int8, 'txst': np.int8, 'xfpt': np.int8,
+    'xfst': np.int8, 'xocah': np.int8, 'xocawh': np.int8,
+    'xoodep': np.int8, 'xopar': np.int8, 'xtot': np.int8,
+    'agedp1': np.int8, 'agedp2': np.int8, 'agedp3': np.int8,
+    'agir1': np.int8, 'efi': np.int8, 'wsamp': np.int8, 'txrt': np.int8
+}
+# Largest number of amounts added together by a consumer of the file:
+# create_soi adds e00100 and 11 adjustments into totincx
+MAX_TERMS = 12
+# Largest amount stored as int32
+INT32_AMOUNT = (2 ** 31 - 1) // MAX_TERMS
+
+# Named column selections. 'soi' holds the variables read by
+# soi_rets.create_soi.
+PROFILES = {
+    'soi': ['recid', 'mars', 'dsi', 'xocah', 'xocawh', 'xoodep', 'xopar',
+            'agedp1', 'agedp2', 'agedp3', 's006', 'e00100', 'e00200',
+            'e00300', 'e00400', 'e00600', 'e00800', 'e00900', 'e01500',
+            'e01700', 'e02000', 'e02100', 'e02300', 'e02400', 'e02500',
+            'e03150', 'e03210', 'e03220', 'e03230', 'e03240', 'e03260',
+            'e03270', 'e03290', 'e03300', 'e03400', 'e03500', 'e04800']
+}
+
+
+def puf_columns(columns):
+    """
+    Resolve a column selection
+
+    Parameters
+    ----------
+    columns: list of names, name of an entry in PROFILES, or None for all
+             variables
+
+    Returns
+    -------
+    List of names, or None
+    """
+    if columns is None:
+        return None
+    if isinstance(columns, str):
+        if columns not in PROFILES:
+            raise ValueError('Unknown column profile {}'.format(columns))
+        return list(PROFILES[columns])
+    return list(columns)
+
+
+def amount_dtype(values):
+    """
+    Smallest type holding a column of amounts without loss
+    """
+    if values.dtype.kind not in 'iuf' or len(values) == 0:
+        return values.dtype
+    if values.dtype.kind == 'f':
+        if not np.isfinite(values).all() or (values % 1 != 0).any():
+            return values.dtype
+    if np.abs(values).max() <= INT32_AMOUNT:
+        return np.dtype(np.int32)
+    return values.dtype
+
+
+def cache_key(puf_file, columns):
+    """
+    Key of the loaded table for a PUF file in a ParseCache
+    """
+    return ParseCache.key(file_digest(puf_file), columns, sorted(
+        (name, np.dtype(dtype).str) for name, dtype in PUF_DTYPES.items()),
+        INT32_AMOUNT, LOADER_VERSION)
+
+
+def load_puf(puf_file, columns=None, cache=None):
+    """
+    Read the PUF with explicit types, keeping only the return records
+
+    Parameters
+    ----------
+    puf_file: path to the PUF in CSV format
+    columns: variables to keep, either a list of names or the name of an
+             entry in PROFILES such as 'soi'. All variables are kept by
+             default
+    cache: ParseCache, or path to its directory, holding previously loaded
+           files. A file already in the cache is loaded from it instead of
+           being read
+
+    Returns
+    -------
+    PUF as a pandas DF. The aggregate records are dropped and the other
+    records keep their row number in the file as index
+    """
+    columns = puf_columns(columns)
+    if cache is not None:
+        if not isinstance(cache, ParseCache):
+            cache = ParseCache(cache)
+        key = cache_key(puf_file, columns)
+        puf = cache.get(key)
+        if puf is not None:
+            return puf
+
+    usecols = None
+    if columns is not None:
+        # recid is needed to drop the aggregate records
+        usecols = columns + ([] if 'recid' in columns else ['recid'])
+    table = pd.read_csv(puf_file, usecols=usecols, dtype=PUF_DTYPES)
+    keep = table['recid'].values != AGGREGATE
+    dropped = not keep.all()
+    index = np.flatnonzero(keep) if dropped else pd.RangeIndex(len(table))
+    # Each column is filtered and converted on its own, so the table is
+    # never copied whole
+    data = OrderedDict()
+    for name in (table.columns if columns is None else columns):
+        values = table[name].values
+        if dropped:
+            values = values[keep]
+        if name not in PUF_DTYPES:
+            values = values.astype(amount_dtype(values), copy=False)
+        data[name] = values
+    del table
+    puf = pd.DataFrame(data, index=index, copy=False)
+    if cache is not None:
+        cache.put(key, puf)
+    return puf
@@ -9,7 +9,7 @@ import numpy as np
 
 def create_soi(SOI):
     # SOI = pd.read_sas('puf2009.sas7bdat')
-    SOI = SOI[SOI['recid'] != 999999]
+    # The aggregate records are dropped by puf.load_puf
 
     SOI['filer'] = 1
     SOI['dmfs'] = 1